@@ -0,0 +1,8 @@
+"""
+Riddler: Null Set - KCTF toolkit
+
+Library behind the `kctf` command. Submodules are imported on demand;
+importing the package itself loads nothing else.
+"""
+
+__version__ = "0.1.0"
@@ -0,0 +1,310 @@
+"""
+Riddler: Null Set - Streaming Key Audit Service
+
+Long-running version of the common factor attack for moduli that keep
+arriving from scans. Every modulus seen so far is kept in a
+ProductForest, so a new one is checked against the whole set with one
+gcd against the accumulated product (plus a descent into the product
+trees when that gcd is not 1) instead of a gcd against every earlier
+modulus.
+
+Hits go to one or more sinks (a JSON-lines file, an in-process queue)
+and moduli can be fed in over HTTP or a Unix socket:
+
+    kctf audit --http 127.0.0.1:8700 --sink hits.jsonl
+    curl --data-binary @moduli.txt http://127.0.0.1:8700/moduli
+
+    kctf audit --unix /tmp/kctf-audit.sock --sink hits.jsonl
+    nc -U /tmp/kctf-audit.sock < moduli.txt
+
+Moduli are sent one per line, in decimal or 0x-prefixed hex. With
+--state the product trees are saved every --save-every new moduli or
+--save-interval seconds, and on SIGINT or SIGTERM.
+"""
+
+import argparse
+import json
+import os
+import signal
+import stat
+import sys
+import threading
+import time
+
+from . import instrument
+from .dedupe import Deduplicator
+from .primitives import parse_modulus
+from .product_tree import ProductForest
+
+
+class FileSink:
+    """Append every hit to a file as one JSON object per line"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, hit):
+        line = json.dumps(hit) + "\n"
+        with self._lock, open(self.path, "a") as f:
+            f.write(line)
+
+
+class QueueSink:
+    """Put every hit on a queue.Queue (or anything with a put method)"""
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def __call__(self, hit):
+        self.queue.put(hit)
+
+
+class AuditService:
+    """
+    Accumulates moduli and reports every pair that shares a factor.
+
+    submit() is thread safe; the HTTP and Unix socket front ends call it
+    from their handler threads. With a `state` directory the forest is
+    saved there once `save_every` new moduli have arrived or
+    `save_interval` seconds have passed since the last save.
+    """
+
+    def __init__(self, sinks=(), forest=None, state=None, save_every=1000, save_interval=60.0):
+        self.forest = forest if forest is not None else ProductForest()
+        self.labels = [None] * len(self.forest)
+        self.dedup = Deduplicator(self.forest.__getitem__)
+        self.dedup.load(self.forest.leaves())
+        self.sinks = list(sinks)
+        self.hits = 0
+        self.duplicates = 0
+        self.state = state
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self._unsaved = 0
+        self._last_save = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _save_locked(self):
+        if self.state is None:
+            return
+        with instrument.stage("audit.save"):
+            self.forest.save(self.state)
+        self._unsaved = 0
+        self._last_save = time.monotonic()
+
+    def save(self):
+        """Write the forest to the state directory, if there is one"""
+        with self._lock:
+            self._save_locked()
+
+    def submit(self, n, label=None):
+        """
+        Check n against everything seen so far, then add it. Returns the hits.
+
+        An exact copy of an earlier modulus is reported as a "duplicate"
+        hit and not added again. A gcd equal to n means n divides the
+        partner and is reported as "divides" rather than as a factor.
+        Raises ValueError for n <= 1, which would zero or poison the
+        accumulated product.
+        """
+        if n <= 1:
+            raise ValueError(f"moduli must be greater than 1, got {n}")
+        with instrument.stage("audit.submit"), self._lock:
+            first = self.dedup.seen(n)
+            if first is not None:
+                self.duplicates += 1
+                hits = [{
+                    "kind": "duplicate",
+                    "index": first,
+                    "label": label,
+                    "partner": first,
+                    "partner_label": self.labels[first],
+                    "time": time.time(),
+                }]
+            else:
+                found = self.forest.shared(n)
+                index = self.forest.add(n)
+                self.dedup.add(n, index)
+                self.labels.append(label)
+                self._unsaved += 1
+                if self._unsaved >= self.save_every or time.monotonic() - self._last_save >= self.save_interval:
+                    self._save_locked()
+                hits = []
+                for partner, factor in found:
+                    hit = {
+                        "kind": "divides" if factor == n else "shared",
+                        "index": index,
+                        "label": label,
+                        "partner": partner,
+                        "partner_label": self.labels[partner],
+                        "factor": factor,
+                        "time": time.time(),
+                    }
+                    hits.append(hit)
+            self.hits += len(hits)
+        for hit in hits:
+            for sink in self.sinks:
+                sink(hit)
+        return hits
+
+    def submit_lines(self, lines, label=None):
+        """
+        Parse every line first, then submit them all. A bad line raises
+        ValueError before anything has been added.
+        """
+        moduli = [parse_modulus(line) for line in lines if line.strip()]
+        hits = []
+        for n in moduli:
+            hits.extend(self.submit(n, label))
+        return hits
+
+    def stats(self):
+        return {
+            "moduli": len(self.forest),
+            "trees": len(self.forest.trees),
+            "hits": self.hits,
+            "duplicates": self.duplicates,
+        }
+
+
+def _http_handler(service):
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._reply(200, service.stats())
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/moduli":
+                self._reply(404, {"error": "not found"})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length)
+            try:
+                hits = service.submit_lines(body.decode().splitlines(), self.headers.get("X-Label"))
+            except ValueError as e:
+                self._reply(400, {"error": str(e)})
+                return
+            self._reply(200, {"hits": hits})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def _unix_handler(service):
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                if not raw.strip():
+                    continue
+                try:
+                    hits = service.submit(parse_modulus(raw.decode()))
+                    reply = {"hits": hits}
+                except ValueError as e:
+                    reply = {"error": str(e)}
+                self.wfile.write((json.dumps(reply) + "\n").encode())
+
+    return Handler
+
+
+def serve_http(service, host, port):
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), _http_handler(service))
+    server.daemon_threads = True
+    return server
+
+
+def serve_unix(service, path):
+    import socketserver
+
+    class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    if os.path.lexists(path):
+        if not stat.S_ISSOCK(os.lstat(path).st_mode):
+            raise FileExistsError(f"{path} exists and is not a socket")
+        os.unlink(path)
+    return UnixServer(path, _unix_handler(service))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="kctf audit", description="Streaming shared-factor audit for RSA moduli")
+    parser.add_argument("files", nargs="*", help="files of moduli (one per line) to load first")
+    parser.add_argument("--http", metavar="HOST:PORT", help="serve the HTTP ingest endpoint")
+    parser.add_argument("--unix", metavar="PATH", help="serve the Unix socket ingest endpoint")
+    parser.add_argument("--sink", metavar="PATH", action="append", default=[],
+                        help="append hits to this JSON-lines file (repeatable)")
+    parser.add_argument("--state", metavar="DIR",
+                        help="load product trees from DIR at start and save them back as moduli arrive")
+    parser.add_argument("--save-every", type=int, default=1000, metavar="N",
+                        help="with --state, save after this many new moduli (default 1000)")
+    parser.add_argument("--save-interval", type=float, default=60.0, metavar="SECONDS",
+                        help="with --state, save at least this often while moduli arrive (default 60)")
+    args = parser.parse_args(argv)
+
+    sinks = [FileSink(path) for path in args.sink]
+    if not sinks:
+        sinks.append(lambda hit: print(json.dumps(hit), flush=True))
+    forest = ProductForest.load(args.state) if args.state else None
+    service = AuditService(sinks, forest, args.state, args.save_every, args.save_interval)
+
+    for path in args.files:
+        with open(path) as f:
+            service.submit_lines(f, label=path)
+    print(f"Loaded: {service.stats()}", file=sys.stderr)
+
+    servers = []
+    if args.http:
+        host, _, port = args.http.rpartition(":")
+        servers.append(serve_http(service, host or "127.0.0.1", int(port)))
+    if args.unix:
+        try:
+            servers.append(serve_unix(service, args.unix))
+        except FileExistsError as e:
+            parser.error(str(e))
+    if not servers:
+        service.save()
+        return
+
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    # A service manager stops us with SIGTERM: shut down as for Ctrl-C
+    signal.signal(signal.SIGTERM, terminate)
+    threads = [threading.Thread(target=s.serve_forever, daemon=True) for s in servers]
+    for t in threads:
+        t.start()
+    try:
+        for t in threads:
+            t.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for s in servers:
+            s.shutdown()
+            s.server_close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+        service.save()
+
+
+if __name__ == "__main__":
+    instrument.enable_from_argv()
+    main()
@@ -0,0 +1,76 @@
+"""
+Riddler: Null Set - Benchmarks
+
+Wall-clock timings for the primitives every attack leans on and for the
+batch stages built on top of them, on the challenge numbers and on
+random moduli of a chosen size.
+"""
+
+import argparse
+import random
+import time
+
+from . import instrument
+from .challenge import FLAG_ENCRYPTED, HOSPITAL, SUBWAY
+from .primitives import gcd, int_to_bytes, is_printable, powmod
+
+
+def _time(func, repeat):
+    """Best per-call time of func over `repeat` runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="kctf bench", description="Time primitives and attack stages")
+    parser.add_argument("--moduli", type=int, default=512, help="random moduli for the batch stages")
+    parser.add_argument("--bits", type=int, default=1024, help="size of the random moduli")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark (best is reported)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    from .decoding import decode_batch
+    from .product_tree import ProductForest, batch_gcd
+    from .rsa_keys import key
+
+    rng = random.Random(args.seed)
+    moduli = [rng.getrandbits(args.bits) | 1 | (1 << (args.bits - 1)) for _ in range(args.moduli)]
+    candidates = [rng.getrandbits(args.bits) for _ in range(args.moduli)]
+    flag_bytes = int_to_bytes(FLAG_ENCRYPTED)
+    p, q = gcd(HOSPITAL, SUBWAY), HOSPITAL // gcd(HOSPITAL, SUBWAY)
+    hospital_key = key([p, q])
+    hospital_key.decrypt(FLAG_ENCRYPTED)
+
+    def forest_stream():
+        forest = ProductForest()
+        for n in moduli:
+            forest.shared(n)
+            forest.add(n)
+
+    benchmarks = [
+        ("gcd(hospital, subway)", lambda: gcd(HOSPITAL, SUBWAY), 1),
+        ("pow(flag, 65537, hospital)", lambda: powmod(FLAG_ENCRYPTED, 65537, HOSPITAL), 1),
+        ("pow(flag, d, hospital)", lambda: powmod(FLAG_ENCRYPTED, hospital_key.d, HOSPITAL), 1),
+        ("FactoredKey.decrypt (CRT)", lambda: hospital_key.decrypt(FLAG_ENCRYPTED), 1),
+        ("int_to_bytes(flag)", lambda: int_to_bytes(FLAG_ENCRYPTED), 1),
+        ("is_printable(flag bytes)", lambda: is_printable(flag_bytes), 1),
+        (f"batch_gcd({args.moduli} moduli)", lambda: batch_gcd(moduli), args.moduli),
+        (f"ProductForest stream ({args.moduli})", forest_stream, args.moduli),
+        (f"decode_batch({args.moduli} candidates)", lambda: decode_batch(candidates), args.moduli),
+    ]
+
+    print(f"{'benchmark':<40}{'total ms':>12}{'us/item':>12}")
+    print("-" * 64)
+    for name, func, items in benchmarks:
+        with instrument.stage("bench:" + name):
+            seconds = _time(func, args.repeat)
+        print(f"{name:<40}{seconds * 1e3:>12.3f}{seconds / items * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    instrument.enable_from_argv()
+    main()
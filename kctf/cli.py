@@ -0,0 +1,59 @@
+"""
+Riddler: Null Set - Command Line
+
+Single `kctf` entry point. Only argparse is imported up front; each
+subcommand imports its own module when it runs, so `kctf audit` never
+pays for the decoding stage and `kctf xor` never pays for the product
+trees (or for NumPy, which is itself only imported on first use).
+
+    kctf factor [FILES...] [--state DIR]   batch GCD / incremental corpus audit
+    kctf decrypt [-e E]...                 multi-prime RSA on the flag
+    kctf xor [--limit N]                   scheduled XOR key hypotheses
+    kctf audit [--http H:P] [--unix PATH]  streaming audit service
+    kctf jobs submit|run|list              checkpointed long-running attacks
+    kctf relations [FILES...] [--pairs]    memoized pairwise gcd/xor and sharing graph
+    kctf bench                             primitive and stage timings
+
+Any subcommand accepts --profile[=PATH] for timers, counters and folded
+stacks.
+"""
+
+import argparse
+import importlib
+import sys
+
+# subcommand -> (module, help)
+COMMANDS = {
+    "factor": ("kctf.product_tree", "find shared factors with batch GCD"),
+    "decrypt": ("kctf.rsa_keys", "decrypt the flag with multi-prime RSA keys"),
+    "xor": ("kctf.hypotheses", "try scheduled XOR key hypotheses on the flag"),
+    "audit": ("kctf.audit", "run the streaming key-audit service"),
+    "jobs": ("kctf.jobs", "queue and run checkpointed long-running attacks"),
+    "relations": ("kctf.relations", "pairwise relations and the factor sharing graph"),
+    "bench": ("kctf.bench", "time the primitives and attack stages"),
+}
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+
+    from . import instrument
+    full = ["kctf"] + argv
+    instrument.enable_from_argv(full)
+    argv = full[1:]
+
+    parser = argparse.ArgumentParser(prog="kctf", description="Riddler: Null Set toolkit")
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+    for name, (_, help_text) in COMMANDS.items():
+        subparsers.add_parser(name, help=help_text, add_help=False)
+    args = parser.parse_args(argv[:1])
+    if args.command is None:
+        parser.print_help()
+        return 2
+
+    module = importlib.import_module(COMMANDS[args.command][0])
+    return module.main(argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Riddler: Null Set - Plaintext Encoding Detection
+
+The solve scripts accept a candidate only when its bytes decode to
+printable ASCII outright, so a plaintext that is PKCS#1 v1.5 or OAEP
+padded, base64 encoded, zlib/gzip/bz2/xz compressed or written
+little-endian is thrown away.
+
+Decoding is done in two passes. prefilter() runs cheap structural
+detectors over a whole batch of candidates: byte-class counts through a
+lookup table (one NumPy pass over the concatenated batch when NumPy is
+installed and the batch has more than one candidate, bytes.translate
+per candidate otherwise) plus a look at the
+first few bytes. Only candidates a detector fires on go through decode(),
+which does the real unpadding, base64 decoding and decompression and
+recurses into the result.
+"""
+
+import base64
+import binascii
+import bz2
+import gzip
+import hashlib
+import lzma
+import zlib
+
+from .primitives import int_to_bytes, is_printable, optional_numpy
+
+BASE64_MIN = 0.98
+MAX_DEPTH = 4
+
+_PRINTABLE = bytes(b for b in range(256) if 32 <= b < 127)
+_BASE64 = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=-_\n"
+_NOT_PRINTABLE = bytes(b for b in range(256) if b not in _PRINTABLE)
+# Frequent English bigrams, for telling a text from its reversal
+_BIGRAMS = frozenset(
+    "th he in er an re on at en nd ti es or te of ed is it al ar st to nt ng se ha as ou io le "
+    "ve co me de hi ri ro ic ne ea ra ce".split())
+_NOT_BASE64 = bytes(b for b in range(256) if b not in _BASE64)
+
+MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x78\x01", "zlib"),
+    (b"\x78\x5e", "zlib"),
+    (b"\x78\x9c", "zlib"),
+    (b"\x78\xda", "zlib"),
+)
+
+_DECOMPRESS = {
+    "gzip": gzip.decompress,
+    "bz2": bz2.decompress,
+    "xz": lzma.decompress,
+    "zlib": zlib.decompress,
+}
+
+
+def _class_counts(batch):
+    """(printable count, base64 count) for every candidate in batch"""
+    np = optional_numpy() if len(batch) > 1 else None
+    if np is not None:
+        table = np.zeros(256, dtype=np.uint8)
+        table[list(_PRINTABLE)] |= 1
+        table[list(_BASE64)] |= 2
+        lengths = np.fromiter((len(b) for b in batch), dtype=np.int64, count=len(batch))
+        classes = table[np.frombuffer(b"".join(batch), dtype=np.uint8)]
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        nonempty = lengths > 0
+        printable = np.zeros(len(batch), dtype=np.int64)
+        b64 = np.zeros(len(batch), dtype=np.int64)
+        if nonempty.any():
+            printable[nonempty] = np.add.reduceat(classes & 1, starts[nonempty])
+            b64[nonempty] = np.add.reduceat((classes >> 1) & 1, starts[nonempty])
+        return list(zip(printable.tolist(), b64.tolist()))
+    return [(len(b.translate(None, _NOT_PRINTABLE)), len(b.translate(None, _NOT_BASE64)))
+            for b in batch]
+
+
+def detect(data, printable, b64, size=None):
+    """Names of the detectors that fire for one candidate"""
+    found = []
+    n = len(data)
+    if not n:
+        return found
+    if printable == n:
+        found.append("plain")
+    # Reversing does not change byte classes, so a printable candidate is
+    # also read little-endian and decode() ranks the two readings. For
+    # anything else trailing NULs or a magic number at the end point to
+    # a reversed plaintext.
+    trailing_nul = n - len(data.rstrip(b"\x00"))
+    if (printable == n - trailing_nul) or any(data[::-1].startswith(m) for m, _ in MAGIC):
+        found.append("reversed")
+    if b64 >= BASE64_MIN * n and n >= 8:
+        found.append("base64")
+    if data[0] in (1, 2) and 0 in data[9:]:
+        found.append("pkcs1")
+    # An OAEP block starts with 0x00, which int_to_bytes() drops, so it is
+    # exactly one byte shorter than the modulus
+    if size is not None and n == size - 1 and n >= 41:
+        found.append("oaep")
+    for magic, name in MAGIC:
+        if data.startswith(magic):
+            found.append(name)
+            break
+    return found
+
+
+def prefilter(batch, size=None):
+    """
+    Cheap first pass over a batch of byte strings.
+
+    Returns [(index, detectors)] for the candidates worth decoding.
+    `size` is the modulus length in bytes when the candidates come from an
+    RSA decryption; it enables the OAEP check.
+    """
+    out = []
+    for i, (data, (printable, b64)) in enumerate(zip(batch, _class_counts(batch))):
+        found = detect(data, printable, b64, size)
+        if found:
+            out.append((i, found))
+    return out
+
+
+def unpad_pkcs1_v15(data):
+    """Strip PKCS#1 v1.5 block type 1 or 2 padding (leading 00 already dropped)"""
+    if len(data) < 10 or data[0] not in (1, 2):
+        return None
+    end = data.find(b"\x00", 1)
+    if end < 9:
+        return None
+    if data[0] == 1 and data[1:end].strip(b"\xff"):
+        return None
+    return data[end + 1:]
+
+
+def _mgf1(seed, length, hash_func):
+    out = b""
+    counter = 0
+    while len(out) < length:
+        out += hash_func(seed + counter.to_bytes(4, "big")).digest()
+        counter += 1
+    return out[:length]
+
+
+def unpad_oaep(data, size, hash_func=hashlib.sha1, label=b""):
+    """Strip RSAES-OAEP padding from a decrypted block of `size` bytes"""
+    h_len = hash_func().digest_size
+    if len(data) > size or size < 2 * h_len + 2:
+        return None
+    em = data.rjust(size, b"\x00")
+    if em[0] != 0:
+        return None
+    masked_seed, masked_db = em[1:1 + h_len], em[1 + h_len:]
+    seed = bytes(a ^ b for a, b in zip(masked_seed, _mgf1(masked_db, h_len, hash_func)))
+    # MGF1 output for a shorter length is a prefix of the longer one, so the
+    # label hash can be checked before unmasking the whole block
+    if bytes(a ^ b for a, b in zip(masked_db, _mgf1(seed, h_len, hash_func))) != hash_func(label).digest():
+        return None
+    db = bytes(a ^ b for a, b in zip(masked_db, _mgf1(seed, size - h_len - 1, hash_func)))
+    rest = db[h_len:].lstrip(b"\x00")
+    if not rest or rest[0] != 1:
+        return None
+    return rest[1:]
+
+
+def _transform(data, detector, size):
+    """Apply one decoding step; None when it does not apply"""
+    if detector == "plain":
+        return data
+    if detector == "reversed":
+        return data[::-1].strip(b"\x00")
+    if detector == "pkcs1":
+        return unpad_pkcs1_v15(data)
+    if detector == "oaep":
+        for hash_func in (hashlib.sha1, hashlib.sha256):
+            result = unpad_oaep(data, size, hash_func)
+            if result is not None:
+                return result
+        return None
+    try:
+        if detector == "base64":
+            # Wrapped output (base64.encodebytes, PEM) has line breaks
+            text = b"".join(data.split())
+            if b"-" in text or b"_" in text:
+                return base64.urlsafe_b64decode(text + b"=" * (-len(text) % 4))
+            return base64.b64decode(text + b"=" * (-len(text) % 4), validate=True)
+        if detector in _DECOMPRESS:
+            return _DECOMPRESS[detector](data)
+    except (binascii.Error, ValueError, OSError, EOFError, zlib.error, lzma.LZMAError):
+        return None
+    return None
+
+
+def text_score(text):
+    """
+    How much text reads like English or a flag, in an order-sensitive
+    way: common bigrams plus brackets that open before they close.
+    """
+    lower = text.lower()
+    score = sum(lower[i:i + 2] in _BIGRAMS for i in range(len(lower) - 1))
+    for opening, closing in ("{}", "()", "[]"):
+        first, last = text.find(opening), text.rfind(closing)
+        if first != -1 and last > first:
+            score += 3
+    return score
+
+
+def _rank_endianness(results):
+    """
+    Drop a "reversed" reading that equals the "plain" one, and put
+    whichever of the two scores higher first.
+    """
+    texts = dict(results)
+    if "plain" not in texts or "reversed" not in texts:
+        return results
+    plain, flipped = texts["plain"], texts["reversed"]
+    if plain == flipped:
+        return [r for r in results if r[0] != "reversed"]
+    if text_score(flipped) > text_score(plain):
+        results = [r for r in results if r[0] != "reversed"]
+        at = next(i for i, r in enumerate(results) if r[0] == "plain")
+        results.insert(at, ("reversed", flipped))
+    return results
+
+
+def decode(data, detectors=None, size=None, depth=0):
+    """
+    Full decoding of one candidate.
+
+    Returns a list of (chain, text) where chain names the steps that led
+    to a printable ASCII text, e.g. "pkcs1+base64+zlib". Endianness is a
+    property of the integer, so "reversed" is only tried on the outside;
+    when both byte orders are printable the likelier text comes first.
+    """
+    if detectors is None:
+        counts = _class_counts([data])[0]
+        detectors = detect(data, counts[0], counts[1], size)
+    results = []
+    for detector in detectors:
+        out = _transform(data, detector, size)
+        if not out:
+            continue
+        if is_printable(out):
+            results.append((detector, out.decode("ascii")))
+        if detector == "plain" or depth + 1 >= MAX_DEPTH:
+            continue
+        counts = _class_counts([out])[0]
+        following = [d for d in detect(out, counts[0], counts[1])
+                     if d not in ("plain", "reversed", detector)]
+        for chain, text in decode(out, following, depth=depth + 1):
+            results.append((f"{detector}+{chain}", text))
+    return _rank_endianness(results)
+
+
+def decode_batch(candidates, size=None):
+    """
+    Decode a batch of int or bytes candidates.
+
+    Returns [(index, chain, text)] for every decoding that ends in
+    printable ASCII.
+    """
+    batch = [c if isinstance(c, (bytes, bytearray)) else int_to_bytes(c) for c in candidates]
+    out = []
+    for i, detectors in prefilter(batch, size):
+        for chain, text in decode(batch[i], detectors, size):
+            out.append((i, chain, text))
+    return out
+
+
+def decode_plaintext(candidate, size=None):
+    """
+    (chain, text) for the first printable decoding of one candidate, else
+    None. Drop-in test for Scheduler.run().
+    """
+    for _, chain, text in decode_batch([candidate], size):
+        return chain, text
+    return None
@@ -0,0 +1,138 @@
+"""
+Riddler: Null Set - Modulus Deduplication
+
+Harvested corpora are full of exact duplicates. Fed to a gcd they give
+gcd(n, n) = n, which a `p = gcd(hospital, subway)` style check would
+happily report as a shared factor. This stage collapses them before the
+product trees are built and reports the duplicate clusters instead.
+
+Moduli are indexed by their 8-byte fingerprint in the same compact
+FingerprintIndex the columnar store uses (16 bytes a modulus with
+NumPy), and a fingerprint match is confirmed against the stored value
+before anything is called a copy.
+
+    python3 -m kctf.dedupe moduli.txt more_moduli.txt
+"""
+
+import argparse
+from collections import defaultdict
+
+from . import instrument
+from .modstore import FingerprintIndex, fingerprint
+from .primitives import parse_modulus
+
+
+class Deduplicator:
+    """
+    Streaming duplicate detector.
+
+    `lookup(index)` must return the modulus stored at an index; it is
+    only called to confirm a fingerprint match. Without one the
+    deduplicator keeps its own copy of the moduli it has accepted and
+    check() numbers them itself. With one, the caller owns the numbering
+    and reports stored moduli through load() and add().
+    """
+
+    def __init__(self, lookup=None):
+        self.index = FingerprintIndex()
+        self.clusters = defaultdict(list)
+        self.count = 0
+        self._own = [] if lookup is None else None
+        self._lookup = lookup if lookup is not None else self._own.__getitem__
+
+    def seen(self, n, fp=None):
+        """Index of an earlier accepted copy of n, or None"""
+        fp = fp or fingerprint(n)
+        for i in self.index.rows(fp):
+            if self._lookup(i) == n:
+                return i
+        return None
+
+    def add(self, n, index, fp=None):
+        """Record that n is stored at `index` of the lookup"""
+        self.index.add(fp or fingerprint(n), index)
+
+    def load(self, moduli):
+        """
+        Index moduli already stored at positions 0, 1, 2, ... of the lookup.
+
+        Every position counts, so a copy in the stored set keeps the
+        positions after it aligned; only its first occurrence is indexed.
+        """
+        for position, n in enumerate(moduli):
+            fp = fingerprint(n)
+            if self.seen(n, fp) is None:
+                self.add(n, position, fp)
+            self.count = position + 1
+
+    def check(self, n, position=None):
+        """
+        Accept n or record it as a duplicate.
+
+        Returns None when n is new (it gets the next index) or the index
+        of the earlier copy. `position` is what gets recorded in the
+        duplicate cluster, the input position by default.
+        """
+        fp = fingerprint(n)
+        first = self.seen(n, fp)
+        if first is not None:
+            self.clusters[first].append(self.count if position is None else position)
+            return first
+        self.add(n, self.count, fp)
+        if self._own is not None:
+            self._own.append(n)
+        self.count += 1
+        return None
+
+    def report(self):
+        """Duplicate clusters as (first index, [positions of the copies])"""
+        return sorted(self.clusters.items())
+
+
+def dedupe(moduli):
+    """
+    Drop exact duplicates from moduli.
+
+    Returns (unique, clusters): the distinct moduli in first-seen order and
+    a list of index lists into the input, one per group of copies.
+    """
+    dedup = Deduplicator()
+    unique = []
+    first_position = []
+    groups = defaultdict(list)
+    for position, n in enumerate(moduli):
+        first = dedup.check(n)
+        if first is None:
+            unique.append(n)
+            first_position.append(position)
+        else:
+            groups[first_position[first]].append(position)
+    clusters = [[first] + copies for first, copies in sorted(groups.items())]
+    return unique, clusters
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find duplicate moduli")
+    parser.add_argument("files", nargs="+", help="files of moduli, one per line")
+    parser.add_argument("--output", metavar="PATH", help="write the distinct moduli here")
+    args = parser.parse_args(argv)
+
+    moduli = []
+    for path in args.files:
+        with open(path) as f:
+            moduli.extend(parse_modulus(line) for line in f if line.strip())
+
+    with instrument.stage("dedupe"):
+        unique, clusters = dedupe(moduli)
+    print(f"{len(moduli)} moduli, {len(unique)} distinct, {len(clusters)} duplicate clusters")
+    for cluster in clusters:
+        print(f"  lines {', '.join(str(i + 1) for i in cluster)}: {str(moduli[cluster[0]])[:40]}...")
+    if args.output:
+        with open(args.output, "w") as f:
+            for n in unique:
+                f.write(f"{n}\n")
+
+
+if __name__ == "__main__":
+    instrument.enable_from_argv()
+    main()
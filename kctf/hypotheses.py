@@ -0,0 +1,228 @@
+"""
+Riddler: Null Set - Hypothesis Scheduler
+
+solve_final.py, solve_modular.py and solve_crt.py each build a small
+list of key candidates up front and walk it in whatever order it was
+typed. Here every attack family is a lazy generator registered with a
+cost per hypothesis and a prior probability that the family holds the
+answer. A heap with one entry per family always pulls the next
+hypothesis from the family with the best expected payoff per unit of
+cost, so cheap, likely attacks run first and memory stays constant no
+matter how many hypotheses the families can produce.
+
+The score of a family's next hypothesis is prior * decay**tried / cost:
+each miss makes the family a little less attractive, which interleaves
+families instead of draining one before starting the next.
+"""
+
+import argparse
+import heapq
+from functools import partial
+from itertools import count
+
+from . import instrument
+from .relations import Relations
+
+
+class Family:
+    """One registered attack family"""
+
+    __slots__ = ("name", "factory", "cost", "prior", "decay", "tried", "iterator")
+
+    def __init__(self, name, factory, cost, prior, decay):
+        self.name = name
+        self.factory = factory
+        self.cost = cost
+        self.prior = prior
+        self.decay = decay
+        self.tried = 0
+        self.iterator = None
+
+    def score(self):
+        return self.prior * self.decay ** self.tried / self.cost
+
+
+class Scheduler:
+    """
+    Priority scheduler over lazily generated hypotheses.
+
+    A factory is a zero-argument callable returning an iterator of
+    (label, candidate) pairs. It is not called until the family is first
+    scheduled.
+    """
+
+    def __init__(self):
+        self.families = []
+
+    def register(self, name, factory, cost=1.0, prior=0.1, decay=0.9):
+        if cost <= 0:
+            raise ValueError("cost must be positive")
+        family = Family(name, factory, cost, prior, decay)
+        self.families.append(family)
+        return family
+
+    def __iter__(self):
+        """Yield (family name, label, candidate) in priority order"""
+        order = count()
+        heap = [(-f.score(), next(order), f) for f in self.families]
+        heapq.heapify(heap)
+        while heap:
+            _, _, family = heapq.heappop(heap)
+            if family.iterator is None:
+                family.iterator = iter(family.factory())
+            try:
+                label, candidate = next(family.iterator)
+            except StopIteration:
+                continue
+            family.tried += 1
+            yield family.name, label, candidate
+            heapq.heappush(heap, (-family.score(), next(order), family))
+
+    def run(self, test, limit=None):
+        """
+        Feed hypotheses to test() until it returns something other than None.
+
+        Returns (family name, label, result), or None when every family is
+        exhausted or `limit` hypotheses have been tried.
+        """
+        for tried, (name, label, candidate) in enumerate(self, 1):
+            with instrument.stage("hypothesis:" + name):
+                result = test(candidate)
+            if result is not None:
+                return name, label, result
+            if limit is not None and tried >= limit:
+                break
+        return None
+
+    def run_batched(self, test_batch, batch_size=64, limit=None):
+        """
+        Like run(), but hands test_batch() lists of candidates.
+
+        test_batch(candidates) returns [(index, ...)] for the hits in the
+        batch (the decoding.decode_batch() shape). Returns (family name,
+        label, hit) for the first hit of the first batch that has one.
+        """
+        pending = []
+        tried = 0
+        for item in self:
+            pending.append(item)
+            tried += 1
+            done = limit is not None and tried >= limit
+            if len(pending) == batch_size or done:
+                found = self._test_batch(test_batch, pending)
+                if found is not None or done:
+                    return found
+                pending = []
+        return self._test_batch(test_batch, pending) if pending else None
+
+    @staticmethod
+    def _test_batch(test_batch, pending):
+        with instrument.stage("hypothesis-batch"):
+            hits = test_batch([candidate for _, _, candidate in pending])
+        if not hits:
+            return None
+        first = min(hits, key=lambda hit: hit[0])
+        name, label, _ = pending[first[0]]
+        return name, label, first[1:]
+
+
+# Attack families from the solve_*.py scripts. Each yields candidate
+# plaintexts as ints; the factors are only computed once the family is
+# actually scheduled.
+
+def factor_xor(bombs, flag):
+    """solve_final.py: the shared factors (and combinations) as XOR keys"""
+    p, q, s = bombs.gcd(0, 1), bombs.gcd(0, 2), bombs.gcd(1, 2)
+    yield "p", flag ^ p
+    yield "q", flag ^ q
+    yield "s", flag ^ s
+    yield "p ⊕ q", flag ^ p ^ q
+    yield "p ⊕ s", flag ^ p ^ s
+    yield "q ⊕ s", flag ^ q ^ s
+    yield "p ⊕ q ⊕ s", flag ^ p ^ q ^ s
+    yield "p * q mod 2^2048", flag ^ (p * q) % (2**2048)
+    yield "p + q + s", flag ^ (p + q + s)
+
+
+def ciphertext_xor(bombs, flag):
+    """solve_final.py: XOR combinations of the bombs as keys"""
+    xor_hs, xor_hf, xor_sf = bombs.xor(0, 1), bombs.xor(0, 2), bombs.xor(1, 2)
+    yield "H ⊕ S", flag ^ xor_hs
+    yield "H ⊕ F", flag ^ xor_hf
+    yield "S ⊕ F", flag ^ xor_sf
+    yield "(H⊕S) ⊕ (H⊕F)", flag ^ xor_hs ^ xor_hf
+    yield "(H⊕S) ⊕ (S⊕F)", flag ^ xor_hs ^ xor_sf
+    yield "(H⊕F) ⊕ (S⊕F)", flag ^ xor_hf ^ xor_sf
+
+
+def difference_xor(bombs, flag):
+    """solve_modular.py: differences between the bombs as keys"""
+    diff1, diff2, diff3 = bombs.diff(1, 0), bombs.diff(2, 0), bombs.diff(2, 1)
+    yield "diff1 (S-H)", flag ^ diff1
+    yield "diff2 (F-H)", flag ^ diff2
+    yield "diff3 (F-S)", flag ^ diff3
+    yield "diff1+diff2", flag ^ (diff1 + diff2)
+    yield "diff1*diff2", flag ^ (diff1 * diff2)
+
+
+def factor_residues(bombs, flag):
+    """solve_crt.py: residues of the flag and the factors, read directly"""
+    p, q, s = bombs.gcd(0, 1), bombs.gcd(0, 2), bombs.gcd(1, 2)
+    yield "p mod flag", p % flag
+    yield "q mod flag", q % flag
+    yield "s mod flag", s % flag
+    yield "flag mod p", flag % p
+    yield "flag mod q", flag % q
+    yield "flag mod s", flag % s
+
+
+def single_byte_xor(flag):
+    """The flag XOR a repeated single byte"""
+    width = (flag.bit_length() + 7) // 8
+    for b in range(1, 256):
+        yield f"byte 0x{b:02x}", flag ^ int.from_bytes(bytes([b]) * width, "big")
+
+
+def challenge_scheduler(hospital, subway, financial, flag):
+    """
+    Scheduler with every family from the solve scripts registered. The
+    families share one Relations over the bombs, so the gcds that
+    factor-xor and factor-residues both need are computed once.
+    """
+    args = (Relations([hospital, subway, financial], ["hospital", "subway", "financial"]), flag)
+    scheduler = Scheduler()
+    scheduler.register("ciphertext-xor", partial(ciphertext_xor, *args), cost=1.0, prior=0.3)
+    scheduler.register("difference-xor", partial(difference_xor, *args), cost=1.0, prior=0.1)
+    scheduler.register("factor-xor", partial(factor_xor, *args), cost=1.5, prior=0.3)
+    scheduler.register("factor-residues", partial(factor_residues, *args), cost=1.5, prior=0.1)
+    scheduler.register("single-byte-xor", partial(single_byte_xor, flag), cost=1.0, prior=0.05, decay=0.99)
+    return scheduler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="kctf xor",
+                                     description="Scheduled XOR/difference/residue key hypotheses against the flag")
+    parser.add_argument("--limit", type=int, help="stop after this many hypotheses")
+    parser.add_argument("--batch-size", type=int, default=64, help="candidates decoded per batch")
+    args = parser.parse_args(argv)
+
+    from .challenge import FINANCIAL, FLAG_ENCRYPTED, FLAG_FORMAT, HOSPITAL, SUBWAY
+    from .decoding import decode_batch
+
+    print("=== Riddler: Null Set - Scheduled Hypotheses ===\n")
+    scheduler = challenge_scheduler(HOSPITAL, SUBWAY, FINANCIAL, FLAG_ENCRYPTED)
+    found = scheduler.run_batched(decode_batch, args.batch_size, args.limit)
+    for family in scheduler.families:
+        print(f"{family.name:<18} tried {family.tried}")
+    print()
+    if found:
+        name, label, (chain, text) = found
+        print(f"✓ SUCCESS with {name}: {label} (decoded as {chain})")
+        print(f"Flag: {FLAG_FORMAT.format(text)}")
+    else:
+        print("No hypothesis produced a printable plaintext.")
+
+
+if __name__ == "__main__":
+    instrument.enable_from_argv()
+    main()
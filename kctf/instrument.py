@@ -0,0 +1,216 @@
+"""
+Riddler: Null Set - Instrumentation
+
+Opt-in timers and counters around the attack primitives (gcd, pow, hex
+conversion, printable scoring) and around whole attack stages, plus a
+small sampling profiler that writes flamegraph-compatible folded stacks.
+
+Everything is off by default. A disabled counter still costs a wrapper
+call and a flag check: nothing next to a 2048-bit pow(), but several
+times a small-int math.gcd(), so tight loops over small numbers call
+math directly and are timed as a whole with stage(). A disabled stage is
+a shared no-op context manager.
+
+Usage from a script:
+
+    from kctf import instrument
+    instrument.enable_from_argv()   # honours --profile[=path]
+"""
+
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+
+_enabled = False
+_calls = defaultdict(int)
+_seconds = defaultdict(float)
+
+
+def enable():
+    """Turn on timers and counters"""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Turn off timers and counters (recorded numbers are kept)"""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Forget all recorded timings and counts"""
+    _calls.clear()
+    _seconds.clear()
+
+
+def record(name, seconds=0.0, calls=1):
+    """Add a measurement for `name` by hand"""
+    _calls[name] += calls
+    _seconds[name] += seconds
+
+
+def counted(name):
+    """Decorator that times and counts every call of a primitive"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _calls[name] += 1
+                _seconds[name] += time.perf_counter() - start
+        return wrapper
+    return decorator
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record("stage:" + self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name):
+    """Context manager timing one attack stage"""
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def snapshot():
+    """Return {name: (calls, seconds)} for everything recorded so far"""
+    return {name: (_calls[name], _seconds[name]) for name in _calls}
+
+
+def report(file=None):
+    """Print a table of timers and counters, slowest first"""
+    file = file or sys.stderr
+    rows = sorted(snapshot().items(), key=lambda item: item[1][1], reverse=True)
+    print("-" * 70, file=file)
+    print(f"{'name':<36}{'calls':>10}{'total ms':>12}{'us/call':>12}", file=file)
+    print("-" * 70, file=file)
+    for name, (calls, seconds) in rows:
+        per_call = seconds / calls * 1e6 if calls else 0.0
+        print(f"{name:<36}{calls:>10}{seconds * 1e3:>12.3f}{per_call:>12.2f}", file=file)
+    print("-" * 70, file=file)
+
+
+class Sampler:
+    """
+    Sampling profiler over every thread of the process.
+
+    A daemon thread wakes up every `interval` seconds, walks the current
+    stack of every other thread and counts it under the thread's name, so
+    work done in asyncio.to_thread() workers or server handler threads is
+    sampled too. The counts are written in the folded format understood
+    by flamegraph.pl, inferno and speedscope. Long C calls such as a
+    2048-bit pow() hold the GIL, so they show up as one sample per call
+    rather than in proportion to their runtime; the timers from counted()
+    are the better measure for those.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="kctf-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write_folded(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def enable_from_argv(argv=None, default_path="profile.folded"):
+    """
+    Look for --profile or --profile=PATH in argv (sys.argv by default).
+
+    When present the flag is removed, timers and counters are switched on,
+    a Sampler is started over all threads, and at interpreter exit the
+    timing table goes to stderr and the folded stacks go to PATH. Scripts
+    that call exit() mid-module still get their report through atexit.
+    """
+    argv = sys.argv if argv is None else argv
+    path = None
+    for i, arg in enumerate(argv[1:], 1):
+        if arg == "--profile":
+            path = default_path
+        elif arg.startswith("--profile="):
+            path = arg.split("=", 1)[1]
+        else:
+            continue
+        del argv[i]
+        break
+    if path is None:
+        return None
+
+    enable()
+    sampler = Sampler().start()
+
+    def finish():
+        sampler.stop()
+        sampler.write_folded(path)
+        report()
+        print(f"Folded stacks written to {path}", file=sys.stderr)
+
+    atexit.register(finish)
+    return sampler
@@ -0,0 +1,470 @@
+"""
+Riddler: Null Set - Checkpointed Job Queue
+
+Fermat, ECM or a long exponent sweep can run for hours, and the solve
+scripts keep all of their progress in local variables. Here a job is a
+row in a local SQLite queue and an attack is a generator that yields its
+own state (curve index, sieve position, exponent offset) as it goes.
+Workers on an asyncio loop advance the generators in a thread, write the
+latest state back every few seconds and on shutdown, and a restarted run
+resumes every unfinished job from its last checkpoint.
+
+Several `kctf jobs run` processes can share one database. A claimed job
+records its owner and a heartbeat that every checkpoint refreshes; a
+running job is only handed to another worker once its heartbeat is
+older than the lease, i.e. when its owner has died.
+
+    kctf jobs submit fermat n=@hospital --priority 5
+    kctf jobs submit sweep factors=@p,@q c=@flag start=3 stop=1000001
+    kctf jobs run --concurrency 2
+    kctf jobs list
+
+Values starting with @ name the challenge numbers (@hospital, @subway,
+@financial, @flag) or the shared primes (@p, @q, @s).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import time
+from math import isqrt
+
+from . import instrument
+from .primitives import gcd
+
+DEFAULT_DB = "kctf-jobs.sqlite3"
+DEFAULT_LEASE = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'queued',
+    checkpoint TEXT,
+    result TEXT,
+    error TEXT,
+    owner TEXT,
+    heartbeat REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+ATTACKS = {}
+
+
+def attack(name):
+    """
+    Register a resumable attack.
+
+    The function is called as func(params, state) where state is the
+    last checkpoint (None on the first run). It is a generator: every
+    yielded dict is a complete checkpoint, and its return value is the
+    job result (None means the search space was exhausted).
+    """
+    def decorator(func):
+        ATTACKS[name] = func
+        return func
+    return decorator
+
+
+class JobQueue:
+    """
+    SQLite-backed priority queue of attack jobs.
+
+    `owner` names this process in the jobs it claims; `lease` is how many
+    seconds a running job may go without a heartbeat before another
+    process may take it over.
+    """
+
+    def __init__(self, path=DEFAULT_DB, owner=None, lease=DEFAULT_LEASE):
+        self.path = path
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease = lease
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(SCHEMA)
+        columns = {row["name"] for row in self.db.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("heartbeat", "REAL")):
+            if column not in columns:
+                self.db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        if "heartbeat" not in columns:
+            # Jobs left running by a pre-lease version have no owner alive:
+            # an expired heartbeat makes them claimable right away
+            self.db.execute("UPDATE jobs SET heartbeat = 0 WHERE state = 'running'")
+
+    def close(self):
+        self.db.close()
+
+    def submit(self, kind, params, priority=0):
+        if kind not in ATTACKS:
+            raise ValueError(f"unknown attack {kind!r} (known: {', '.join(sorted(ATTACKS))})")
+        now = time.time()
+        cur = self.db.execute(
+            "INSERT INTO jobs (kind, params, priority, created, updated) VALUES (?, ?, ?, ?, ?)",
+            (kind, json.dumps(params), priority, now, now))
+        return cur.lastrowid
+
+    def claim(self):
+        """
+        Mark the best claimable job as running under this owner and
+        return it, or None. Queued jobs and running jobs whose lease has
+        expired are claimable.
+        """
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.db.execute(
+                "SELECT * FROM jobs WHERE state = 'queued' OR (state = 'running' AND heartbeat < ?) "
+                "ORDER BY priority DESC, id LIMIT 1", (now - self.lease,)).fetchone()
+            if row is not None:
+                self.db.execute(
+                    "UPDATE jobs SET state = 'running', owner = ?, heartbeat = ?, updated = ? WHERE id = ?",
+                    (self.owner, now, now, row["id"]))
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        return row
+
+    def _update(self, job_id, assignments="", values=()):
+        """
+        Apply assignments to a job we still own and renew its heartbeat.
+        False when another owner has taken the job over.
+        """
+        now = time.time()
+        assignments = assignments + ", " if assignments else ""
+        cur = self.db.execute(
+            f"UPDATE jobs SET {assignments}heartbeat = ?, updated = ? WHERE id = ? AND owner = ?",
+            (*values, now, now, job_id, self.owner))
+        return cur.rowcount > 0
+
+    def checkpoint(self, job_id, state=None):
+        """Save state (or only renew the lease when state is None)"""
+        if state is None:
+            return self._update(job_id)
+        return self._update(job_id, "checkpoint = ?", (json.dumps(state),))
+
+    def finish(self, job_id, result):
+        return self._update(job_id, "state = 'done', result = ?", (json.dumps(result),))
+
+    def fail(self, job_id, error):
+        return self._update(job_id, "state = 'failed', error = ?", (error,))
+
+    def requeue(self, job_id):
+        """Give a job we own back to the queue"""
+        return self._update(job_id, "state = 'queued', owner = NULL")
+
+    def jobs(self):
+        return self.db.execute("SELECT * FROM jobs ORDER BY id").fetchall()
+
+
+def _advance(gen, budget):
+    """
+    Run gen for about `budget` seconds in a worker thread.
+
+    Returns (state, done, result): the last yielded state (None if the
+    generator did not yield), whether it finished and its return value.
+    """
+    state = None
+    deadline = time.monotonic() + budget
+    try:
+        while True:
+            state = next(gen)
+            if time.monotonic() >= deadline:
+                return state, False, None
+    except StopIteration as stop:
+        return state, True, stop.value
+
+
+def _record(queue, job_id, state, done, result):
+    """Store a chunk's outcome; False when the job's lease was lost"""
+    if done:
+        owned = queue.finish(job_id, result)
+        if owned:
+            print(f"job {job_id}: done, result {json.dumps(result)}", flush=True)
+    else:
+        owned = queue.checkpoint(job_id, state)
+    if not owned:
+        print(f"job {job_id}: lease lost to another worker, dropping it", flush=True)
+    return owned
+
+
+async def _worker(queue, interval, follow):
+    while True:
+        job = queue.claim()
+        if job is None:
+            if not follow:
+                return
+            await asyncio.sleep(interval)
+            continue
+
+        job_id = job["id"]
+        try:
+            if job["kind"] not in ATTACKS:
+                raise ValueError(f"unknown attack {job['kind']!r}")
+            params = json.loads(job["params"])
+            state = json.loads(job["checkpoint"]) if job["checkpoint"] else None
+            gen = ATTACKS[job["kind"]](params, state)
+            resumed = " (resumed)" if state else ""
+            print(f"job {job_id}: {job['kind']} started{resumed}", flush=True)
+            while True:
+                chunk = asyncio.ensure_future(asyncio.to_thread(_advance, gen, interval))
+                try:
+                    with instrument.stage("job:" + job["kind"]):
+                        state, done, result = await asyncio.shield(chunk)
+                except asyncio.CancelledError:
+                    # Let the running chunk finish so its state is not lost,
+                    # even if the cancellation is repeated while we wait
+                    while not chunk.done():
+                        try:
+                            await asyncio.shield(chunk)
+                        except asyncio.CancelledError:
+                            pass
+                    state, done, result = chunk.result()
+                    if _record(queue, job_id, state, done, result) and not done:
+                        queue.requeue(job_id)
+                        print(f"job {job_id}: interrupted, will resume from its checkpoint", flush=True)
+                    raise
+                if not _record(queue, job_id, state, done, result) or done:
+                    break
+        except Exception as e:
+            queue.fail(job_id, f"{type(e).__name__}: {e}")
+            print(f"job {job_id}: failed: {e}", flush=True)
+
+
+async def run(queue, concurrency=2, interval=5.0, follow=False):
+    """
+    Run queued jobs with `concurrency` workers until the queue is empty.
+    The queue's lease should be several times `interval`, since the
+    heartbeat is renewed once per interval.
+    """
+    workers = [asyncio.create_task(_worker(queue, interval, follow)) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+# Attacks
+
+@attack("fermat")
+def fermat(params, state):
+    """Fermat's method: walk a upwards until a^2 - n is a square"""
+    n = params["n"]
+    steps = params.get("steps", 10**12)
+    chunk = params.get("chunk", 20000)
+    a = state["a"] if state else isqrt(n - 1) + 1
+    step = state["step"] if state else 0
+    while step < steps:
+        for _ in range(min(chunk, steps - step)):
+            b2 = a * a - n
+            b = isqrt(b2)
+            if b * b == b2:
+                return {"p": a - b, "q": a + b, "step": step}
+            a += 1
+            step += 1
+        yield {"a": a, "step": step}
+    return None
+
+
+@attack("trial")
+def trial_division(params, state):
+    """Trial division by odd numbers from the saved sieve position"""
+    n = params["n"]
+    limit = min(params.get("limit", 10**9), isqrt(n))
+    chunk = params.get("chunk", 100000)
+    if n % 2 == 0:
+        return {"factor": 2}
+    position = state["position"] if state else 3
+    while position <= limit:
+        end = min(position + 2 * chunk, limit + 1)
+        for d in range(position, end, 2):
+            if n % d == 0:
+                return {"factor": d}
+        position = end if end % 2 else end + 1
+        yield {"position": position}
+    return None
+
+
+class _Found(Exception):
+    def __init__(self, factor):
+        self.factor = factor
+
+
+def _inverse(v, n):
+    g = gcd(v % n, n)
+    if g != 1:
+        raise _Found(g)
+    return pow(v, -1, n)
+
+
+def _ec_add(P, Q, a, n):
+    if P is None:
+        return Q
+    if Q is None:
+        return P
+    (x1, y1), (x2, y2) = P, Q
+    if x1 == x2:
+        if (y1 + y2) % n == 0:
+            return None
+        slope = (3 * x1 * x1 + a) * _inverse(2 * y1, n) % n
+    else:
+        slope = (y2 - y1) * _inverse(x2 - x1, n) % n
+    x3 = (slope * slope - x1 - x2) % n
+    return x3, (slope * (x1 - x3) - y1) % n
+
+
+def _ec_mul(k, P, a, n):
+    R = None
+    while k:
+        if k & 1:
+            R = _ec_add(R, P, a, n)
+        P = _ec_add(P, P, a, n)
+        k >>= 1
+    return R
+
+
+@attack("ecm")
+def ecm(params, state):
+    """Lenstra ECM stage 1, one checkpoint per curve; curve i is seeded by i"""
+    from .modstore import small_primes
+
+    n = params["n"]
+    b1 = params.get("b1", 50000)
+    curves = params.get("curves", 1000)
+    seed = params.get("seed", 0)
+    primes = small_primes(b1 + 1)
+    curve = state["curve"] if state else 0
+    while curve < curves:
+        rng = random.Random(seed * 1_000_003 + curve)
+        x, y, a = (rng.randrange(n) for _ in range(3))
+        point = (x, y)
+        try:
+            for p in primes:
+                pk = p
+                while pk * p <= b1:
+                    pk *= p
+                point = _ec_mul(pk, point, a, n)
+                if point is None:
+                    break
+        except _Found as found:
+            if found.factor != n:
+                return {"factor": found.factor, "curve": curve}
+        curve += 1
+        yield {"curve": curve}
+    return None
+
+
+@attack("sweep")
+def exponent_sweep(params, state):
+    """Decrypt c under every odd e in [start, stop) and decode the result"""
+    from .decoding import decode_batch
+    from .rsa_keys import key
+
+    factors = params["factors"]
+    c = params["c"]
+    stop = params["stop"]
+    chunk = params.get("chunk", 64)
+    e = state["e"] if state else params.get("start", 3)
+    e |= 1
+    size = None
+    while e < stop:
+        batch = []
+        for candidate in range(e, min(e + 2 * chunk, stop), 2):
+            try:
+                k = key(factors, candidate)
+            except ValueError:
+                continue
+            size = (k.n.bit_length() + 7) // 8
+            batch.append((candidate, k.decrypt(c)))
+        for index, chain, text in decode_batch([m for _, m in batch], size):
+            return {"e": batch[index][0], "decoded": chain, "plaintext": text}
+        e = min(e + 2 * chunk, stop)
+        yield {"e": e}
+    return None
+
+
+def _named_values():
+    from .challenge import BOMBS, FLAG_ENCRYPTED
+    from .relations import challenge_relations
+
+    values = dict(BOMBS)
+    values["flag"] = FLAG_ENCRYPTED
+    # p, q and s are the factors hospital·subway, hospital·financial and
+    # subway·financial have in common, read off the sharing graph
+    shared = {tuple(nodes): f for f, nodes in challenge_relations().sharing().items()}
+    for name, pair in (("p", (0, 1)), ("q", (0, 2)), ("s", (1, 2))):
+        if pair in shared:
+            values[name] = shared[pair]
+    return values
+
+
+def _parse_value(text, named):
+    if "," in text:
+        return [_parse_value(part, named) for part in text.split(",")]
+    if text.startswith("@"):
+        return named[text[1:]]
+    try:
+        return int(text, 0)
+    except ValueError:
+        return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="kctf jobs", description="Checkpointed long-running attacks")
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"queue database (default {DEFAULT_DB})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="queue an attack")
+    submit.add_argument("kind", choices=sorted(ATTACKS))
+    submit.add_argument("params", nargs="*", metavar="KEY=VALUE")
+    submit.add_argument("--priority", type=int, default=0)
+
+    runner = commands.add_parser("run", help="work through the queue")
+    runner.add_argument("--concurrency", type=int, default=2)
+    runner.add_argument("--interval", type=float, default=5.0, help="seconds between checkpoints")
+    runner.add_argument("--follow", action="store_true", help="keep polling for new jobs")
+    runner.add_argument("--lease", type=float, default=DEFAULT_LEASE,
+                        help=f"seconds without a heartbeat before a running job is taken over (default {DEFAULT_LEASE:g})")
+
+    commands.add_parser("list", help="show all jobs")
+    args = parser.parse_args(argv)
+    if args.command == "run" and args.lease < 3 * args.interval:
+        parser.error("--lease must be at least three times --interval")
+
+    queue = JobQueue(args.db, lease=getattr(args, "lease", DEFAULT_LEASE))
+    try:
+        if args.command == "submit":
+            named = _named_values() if any("@" in p for p in args.params) else {}
+            params = {}
+            for item in args.params:
+                name, _, value = item.partition("=")
+                params[name] = _parse_value(value, named)
+            job_id = queue.submit(args.kind, params, args.priority)
+            print(f"job {job_id} queued")
+        elif args.command == "run":
+            try:
+                asyncio.run(run(queue, args.concurrency, args.interval, args.follow))
+            except KeyboardInterrupt:
+                print("interrupted; unfinished jobs resume on the next run")
+        else:
+            for job in queue.jobs():
+                progress = job["result"] or job["error"] or job["checkpoint"] or ""
+                print(f"{job['id']:>5}  {job['kind']:<8} p{job['priority']:<4} {job['state']:<8} {progress[:60]}")
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    instrument.enable_from_argv()
+    main()
@@ -0,0 +1,420 @@
+"""
+Riddler: Null Set - Columnar Modulus Store
+
+Keeping millions of moduli as Python ints costs an object header and a
+pointer per key and scatters the digits across the heap. This store
+keeps them in three flat files instead:
+
+    <path>.limbs    every modulus as little-endian uint32 limbs, back to back
+    <path>.offsets  uint64 limb offset of each modulus (N + 1 entries)
+    <path>.fp       8-byte fingerprint of each modulus
+
+The files are memory-mapped for reading. Lookups by value go through a
+FingerprintIndex built from the fingerprint column on first use: a
+sorted uint64 copy plus the matching rows, 16 bytes per modulus. With NumPy installed limbs()
+and offsets() are zero-copy arrays over the mapping and trial division
+runs on all moduli at once; without it the same methods fall back to
+memoryviews and plain ints. Moduli become ints only when an arithmetic
+routine (batch GCD, a single lookup) actually needs one.
+"""
+
+import argparse
+import hashlib
+import math
+import mmap
+import os
+from collections import defaultdict
+
+from . import instrument
+from .primitives import optional_numpy, parse_modulus
+
+LIMB_BYTES = 4
+FP_BYTES = 8
+
+# 32-bit limbs times a weight below 2**16 stay under 2**48, so the
+# vectorized residue sums cannot overflow uint64 for moduli of up to
+# 2**16 limbs (two million bits).
+_VECTOR_PRIME_LIMIT = 1 << 16
+
+# Fingerprints added since a FingerprintIndex was sorted are kept in a
+# dict until there are this many of them (or an eighth of the sorted
+# ones), then merged into the sorted arrays.
+_RECENT_ROWS = 4096
+
+
+def fingerprint(n):
+    """8-byte blake2b digest of the canonical big-endian bytes of n"""
+    data = n.to_bytes((n.bit_length() + 7) // 8 or 1, "big")
+    return hashlib.blake2b(data, digest_size=FP_BYTES).digest()
+
+
+def small_primes(limit):
+    """Primes below limit (sieve of Eratosthenes)"""
+    sieve = bytearray([1]) * limit
+    sieve[:2] = b"\x00\x00"
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytearray(len(range(i * i, limit, i)))
+    return [i for i in range(limit) if sieve[i]]
+
+
+class FingerprintIndex:
+    """
+    Compact multimap from 8-byte fingerprint to row numbers.
+
+    With NumPy the bulk is a sorted uint64 array of fingerprints plus the
+    matching rows, 16 bytes an entry, searched with searchsorted. Entries
+    added since the last merge sit in a small dict. Without NumPy
+    everything stays in the dict.
+    """
+
+    def __init__(self):
+        self._keys = None
+        self._rows = None
+        self._sorted = 0
+        self._recent = defaultdict(list)
+        self._pending = 0
+
+    def __len__(self):
+        return self._sorted + self._pending
+
+    def load(self, fps):
+        """Add a buffer of packed fingerprints as rows len(self), len(self) + 1, ..."""
+        np = optional_numpy()
+        start = len(self)
+        if np is None:
+            for i in range(len(fps) // FP_BYTES):
+                self._recent[bytes(fps[i * FP_BYTES:(i + 1) * FP_BYTES])].append(start + i)
+                self._pending += 1
+            return
+        self._merge()
+        keys = np.frombuffer(fps, dtype="<u8")
+        rows = np.arange(start, start + len(keys), dtype=np.int64)
+        self._combine(keys, rows)
+
+    def add(self, fp, row):
+        self._recent[fp].append(row)
+        self._pending += 1
+        if self._pending > max(_RECENT_ROWS, self._sorted // 8):
+            self._merge()
+
+    def _combine(self, keys, rows):
+        np = optional_numpy()
+        if self._keys is not None:
+            keys = np.concatenate((self._keys, keys))
+            rows = np.concatenate((self._rows, rows))
+        order = np.lexsort((rows, keys))
+        self._keys, self._rows = keys[order], rows[order]
+        self._sorted = len(self._keys)
+
+    def _merge(self):
+        """Move the recent entries into the sorted arrays (NumPy only)"""
+        np = optional_numpy()
+        if np is None or not self._pending:
+            return
+        keys = np.array([int.from_bytes(fp, "little") for fp, rows in self._recent.items() for _ in rows],
+                        dtype=np.uint64)
+        rows = np.array([row for fp_rows in self._recent.values() for row in fp_rows], dtype=np.int64)
+        self._recent = defaultdict(list)
+        self._pending = 0
+        self._combine(keys, rows)
+
+    def rows(self, fp):
+        """Rows recorded under fp, in ascending order"""
+        rows = list(self._recent.get(fp, ()))
+        if self._sorted:
+            key = optional_numpy().uint64(int.from_bytes(fp, "little"))
+            keys = self._keys
+            i = int(keys.searchsorted(key))
+            while i < self._sorted and keys[i] == key:
+                rows.append(int(self._rows[i]))
+                i += 1
+            if len(rows) > 1:
+                rows.sort()
+        return rows
+
+    def collisions(self):
+        """Lists of two or more rows that share a fingerprint"""
+        self._merge()
+        groups = [list(rows) for rows in self._recent.values() if len(rows) > 1]
+        if self._keys is None:
+            return groups
+        np = optional_numpy()
+        same = np.flatnonzero(self._keys[1:] == self._keys[:-1])
+        last = -2
+        for k in same.tolist():
+            if k != last + 1:
+                groups.append([int(self._rows[k])])
+            groups[-1].append(int(self._rows[k + 1]))
+            last = k
+        return groups
+
+
+class _Column:
+    """One append-only file, memory-mapped for reading"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a+b")
+        self._map = None
+        self._dirty = True
+
+    def size(self):
+        self._file.flush()
+        return os.fstat(self._file.fileno()).st_size
+
+    def append(self, data):
+        self._file.write(data)
+        self._dirty = True
+
+    def _unmap(self):
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # A zero-copy view still points into it; the mapping is
+                # released when the last view goes away.
+                pass
+            self._map = None
+
+    def buffer(self):
+        """mmap over the whole file, refreshed after appends"""
+        if self._dirty:
+            self._unmap()
+            size = self.size()
+            if size:
+                self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+            self._dirty = False
+        return self._map if self._map is not None else b""
+
+    def close(self):
+        self._unmap()
+        self._file.close()
+
+
+class ModulusStore:
+    """
+    Append-only columnar store of moduli with a fingerprint index.
+
+    Indexing a store returns ints; iterating it yields them lazily, so a
+    store can be handed straight to batch_gcd() or ProductForest.extend().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._limbs = _Column(path + ".limbs")
+        self._offsets = _Column(path + ".offsets")
+        self._fps = _Column(path + ".fp")
+        if self._offsets.size() == 0:
+            self._offsets.append((0).to_bytes(8, "little"))
+        self._count = self._offsets.size() // 8 - 1
+        self._end = self._offset(self._count)
+        self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        for column in (self._limbs, self._offsets, self._fps):
+            column.close()
+
+    def __len__(self):
+        return self._count
+
+    def _offset(self, i):
+        buf = self._offsets.buffer()
+        return int.from_bytes(buf[i * 8:(i + 1) * 8], "little")
+
+    def append(self, n):
+        """Store n and return its index"""
+        if n <= 0:
+            raise ValueError("moduli must be positive")
+        limbs = (n.bit_length() + 31) // 32
+        fp = fingerprint(n)
+        self._limbs.append(n.to_bytes(limbs * LIMB_BYTES, "little"))
+        self._end += limbs
+        self._offsets.append(self._end.to_bytes(8, "little"))
+        self._fps.append(fp)
+        if self._index is not None:
+            self._index.add(fp, self._count)
+        self._count += 1
+        return self._count - 1
+
+    def extend(self, moduli):
+        for n in moduli:
+            self.append(n)
+
+    def __getitem__(self, i):
+        if not -self._count <= i < self._count:
+            raise IndexError("modulus index out of range")
+        i %= self._count
+        start, end = self._offset(i), self._offset(i + 1)
+        buf = self._limbs.buffer()
+        return int.from_bytes(buf[start * LIMB_BYTES:end * LIMB_BYTES], "little")
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    def view(self, i):
+        """Zero-copy memoryview of the limbs of modulus i (format 'I')"""
+        start, end = self._offset(i), self._offset(i + 1)
+        return memoryview(self._limbs.buffer())[start * LIMB_BYTES:end * LIMB_BYTES].cast("I")
+
+    def limbs(self):
+        """All limbs as one zero-copy uint32 array (memoryview without NumPy)"""
+        buf = self._limbs.buffer()
+        np = optional_numpy()
+        if np is not None:
+            return np.frombuffer(buf, dtype="<u4")
+        return memoryview(buf).cast("I")
+
+    def offsets(self):
+        """The N + 1 limb offsets as a zero-copy uint64 array"""
+        buf = self._offsets.buffer()
+        np = optional_numpy()
+        if np is not None:
+            return np.frombuffer(buf, dtype="<u8")
+        return memoryview(buf).cast("Q")
+
+    def fingerprint(self, i):
+        buf = self._fps.buffer()
+        return bytes(buf[i * FP_BYTES:(i + 1) * FP_BYTES])
+
+    def _fp_index(self):
+        """The FingerprintIndex over the .fp column, built on first use"""
+        if self._index is None:
+            self._index = FingerprintIndex()
+            self._index.load(self._fps.buffer())
+        return self._index
+
+    def find(self, n):
+        """Index of the first stored copy of n, or None"""
+        for i in self._fp_index().rows(fingerprint(n)):
+            if self[i] == n:
+                return i
+        return None
+
+    def __contains__(self, n):
+        return self.find(n) is not None
+
+    def duplicates(self):
+        """Lists of indices whose moduli are identical"""
+        clusters = []
+        for indices in self._fp_index().collisions():
+            groups = defaultdict(list)
+            for i in indices:
+                groups[self[i]].append(i)
+            clusters.extend(group for group in groups.values() if len(group) > 1)
+        return sorted(clusters)
+
+    def unique(self):
+        """Yield (index, modulus) for the first copy of every distinct modulus"""
+        copies = {i for cluster in self.duplicates() for i in cluster[1:]}
+        for i in range(self._count):
+            if i not in copies:
+                yield i, self[i]
+
+    def trial_division(self, limit=10000):
+        """
+        Every (index, prime) with prime < limit dividing a stored modulus.
+
+        With NumPy the residues of all moduli modulo one prime come from a
+        single weighted reduceat over the limb array; otherwise each
+        modulus is gcd'ed with the primorial and only the hits are split.
+        """
+        primes = small_primes(limit)
+        if not self._count:
+            return []
+        if optional_numpy() is not None and limit <= _VECTOR_PRIME_LIMIT:
+            return self._trial_division_numpy(primes)
+        primorial = 1
+        for p in primes:
+            primorial *= p
+        hits = []
+        for i in range(self._count):
+            g = math.gcd(self[i], primorial)
+            if g != 1:
+                hits.extend((i, p) for p in primes if g % p == 0)
+        return hits
+
+    def _trial_division_numpy(self, primes):
+        np = optional_numpy()
+        limbs = self.limbs().astype(np.uint64)
+        offsets = self.offsets().astype(np.int64)
+        starts = offsets[:-1]
+        lengths = np.diff(offsets)
+        position = np.arange(len(limbs), dtype=np.int64) - np.repeat(starts, lengths)
+        width = int(lengths.max())
+        hits = []
+        for p in primes:
+            weights = np.array([pow(2, 32 * j, p) for j in range(width)], dtype=np.uint64)
+            residues = np.add.reduceat(limbs * weights[position], starts) % p
+            hits.extend((int(i), p) for i in np.flatnonzero(residues == 0))
+        return sorted(hits)
+
+    def batch_gcd(self):
+        """
+        batch_gcd() over the distinct stored moduli, aligned with the store.
+
+        Duplicates are collapsed first (a copy gets the result of its
+        first occurrence) and gcd == n results are split by resolve_full(),
+        so a result equal to n only remains for a modulus that divides
+        another one.
+        """
+        from .product_tree import batch_gcd, resolve_full
+        indices, moduli = [], []
+        for i, n in self.unique():
+            indices.append(i)
+            moduli.append(n)
+        results = resolve_full(moduli, batch_gcd(moduli))
+        by_index = dict(zip(indices, results))
+        out = []
+        for i in range(self._count):
+            if i not in by_index:
+                by_index[i] = by_index[self.find(self[i])]
+            out.append(by_index[i])
+        return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Columnar store of RSA moduli")
+    parser.add_argument("store", help="base path of the store files")
+    parser.add_argument("files", nargs="*", help="files of moduli (one per line) to append")
+    parser.add_argument("--dedupe", action="store_true", help="skip moduli already in the store")
+    parser.add_argument("--trial", type=int, metavar="LIMIT", help="trial divide by primes below LIMIT")
+    parser.add_argument("--batch-gcd", action="store_true", help="run batch GCD over the store")
+    args = parser.parse_args(argv)
+
+    with ModulusStore(args.store) as store:
+        for path in args.files:
+            with open(path) as f, instrument.stage("append"):
+                for line in f:
+                    if not line.strip():
+                        continue
+                    n = parse_modulus(line)
+                    if args.dedupe and n in store:
+                        continue
+                    store.append(n)
+        print(f"{len(store)} moduli in {args.store}")
+
+        if args.trial:
+            with instrument.stage("trial_division"):
+                hits = store.trial_division(args.trial)
+            for i, p in hits:
+                print(f"  #{i} divisible by {p}")
+        if args.batch_gcd:
+            with instrument.stage("batch_gcd"):
+                results = store.batch_gcd()
+            for i, g in enumerate(results):
+                if g != 1:
+                    print(f"  #{i} shares a factor: {g}")
+
+
+if __name__ == "__main__":
+    instrument.enable_from_argv()
+    main()
@@ -0,0 +1,61 @@
+"""
+Riddler: Null Set - Shared Primitives
+
+The arithmetic and decoding helpers that every solve_*.py script writes
+out inline, collected in one place so they can be timed and counted by
+the instrumentation layer.
+"""
+
+import math
+from functools import lru_cache
+
+from .instrument import counted
+
+# Bytes outside the printable ASCII range 32..126
+_NON_PRINTABLE = bytes(b for b in range(256) if not 32 <= b < 127)
+
+
+@counted("gcd")
+def gcd(a, b):
+    return math.gcd(a, b)
+
+
+@counted("pow")
+def powmod(base, exponent, modulus):
+    return pow(base, exponent, modulus)
+
+
+@counted("int_to_bytes")
+def int_to_bytes(n):
+    """Big-endian bytes of n, same result as the hex()/fromhex() dance"""
+    return n.to_bytes((n.bit_length() + 7) // 8 or 1, "big")
+
+
+@counted("is_printable")
+def is_printable(data):
+    """True if every byte (or character) is printable ASCII"""
+    if isinstance(data, str):
+        return all(32 <= ord(c) < 127 for c in data)
+    return data.translate(None, _NON_PRINTABLE) == data
+
+
+def parse_modulus(text):
+    """Parse one decimal or 0x-prefixed hex modulus; ValueError unless n > 1"""
+    text = text.strip()
+    if text[:2].lower() == "0x":
+        n = int(text[2:], 16)
+    else:
+        n = int(text)
+    if n <= 1:
+        raise ValueError(f"moduli must be greater than 1, got {n}")
+    return n
+
+
+@lru_cache(maxsize=None)
+def optional_numpy():
+    """The numpy module if it is installed, else None. Imported on first use."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
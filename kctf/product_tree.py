@@ -0,0 +1,363 @@
+"""
+Riddler: Null Set - Product and Remainder Trees
+
+Batch GCD (Bernstein's product/remainder tree) for finding moduli that
+share a prime with any other modulus, without running every pairwise
+gcd the way solve_clean.py does for its three bombs.
+
+A tree is a list of levels: levels[0] holds the moduli, each level above
+holds the products of adjacent pairs (an odd element is carried up as
+is) and levels[-1] is [product of everything]. The children of node
+(k, i) are (k - 1, 2i) and (k - 1, 2i + 1).
+
+Run as a script to merge a new batch into a stored corpus:
+
+    kctf factor --state corpus/ new_moduli.txt
+"""
+
+import argparse
+import json
+import os
+import shutil
+
+from . import instrument
+from .dedupe import Deduplicator, dedupe
+from .primitives import gcd, parse_modulus
+
+
+def product_tree(values):
+    """Build the levels of a product tree over values"""
+    levels = [list(values)]
+    while len(levels[-1]) > 1:
+        prev = levels[-1]
+        levels.append([prev[i] * prev[i + 1] if i + 1 < len(prev) else prev[i]
+                       for i in range(0, len(prev), 2)])
+    return levels
+
+
+def remainder_tree(levels, value):
+    """Reduce value down the tree: value mod n^2 for every leaf n"""
+    rems = [value % (levels[-1][0] ** 2)]
+    for level in reversed(levels[:-1]):
+        rems = [rems[i // 2] % (n * n) for i, n in enumerate(level)]
+    return rems
+
+
+def batch_gcd(moduli):
+    """
+    For each modulus n, gcd(n, product of all the other moduli).
+
+    Returns a list aligned with moduli. A result of 1 means n shares
+    nothing with the rest of the set. A result of n itself is not a
+    factor; pass the results through resolve_full() to split those.
+    """
+    moduli = list(moduli)
+    if not moduli:
+        return []
+    levels = product_tree(moduli)
+    rems = remainder_tree(levels, levels[-1][0])
+    return [gcd(r // n, n) for r, n in zip(rems, moduli)]
+
+
+def resolve_full(moduli, gcds):
+    """
+    Replace the gcd == n results of batch_gcd() with a proper factor.
+
+    batch_gcd() returns n itself when every prime of n also divides the
+    rest of the set: n has a duplicate, n divides another modulus, or its
+    primes are shared with two different moduli. Pairwise gcds are run
+    for those moduli only. A result stays n when no proper factor exists,
+    i.e. the only partners are copies or multiples of n.
+    """
+    moduli = list(moduli)
+    resolved = list(gcds)
+    for i, (n, g) in enumerate(zip(moduli, gcds)):
+        if g != n:
+            continue
+        for j, m in enumerate(moduli):
+            if j != i:
+                pair = gcd(n, m)
+                if 1 < pair < n:
+                    resolved[i] = pair
+                    break
+    return resolved
+
+
+def descend(levels, n, offset=0):
+    """
+    Find the leaves of a tree that share a factor with n.
+
+    Only branches whose product has a non-trivial gcd with n are opened,
+    so for a rare hit this costs about one reduction per tree level
+    instead of one gcd per leaf. Yields (offset + leaf index, gcd).
+    """
+    top = len(levels) - 1
+    stack = [(top, 0)]
+    while stack:
+        k, i = stack.pop()
+        node = levels[k][i]
+        g = gcd(n, node % n)
+        if g == 1:
+            continue
+        if k == 0:
+            yield offset + i, g
+            continue
+        below = levels[k - 1]
+        for child in (2 * i + 1, 2 * i):
+            if child < len(below):
+                stack.append((k - 1, child))
+
+
+def _write_level(path, values):
+    with open(path, "wb") as f:
+        for v in values:
+            data = v.to_bytes((v.bit_length() + 7) // 8, "big")
+            f.write(len(data).to_bytes(4, "big"))
+            f.write(data)
+
+
+def _read_level(path):
+    values = []
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = 0
+    while pos < len(data):
+        size = int.from_bytes(data[pos:pos + 4], "big")
+        pos += 4
+        values.append(int.from_bytes(data[pos:pos + size], "big"))
+        pos += size
+    return values
+
+
+class ProductForest:
+    """
+    Incrementally maintained product of every modulus seen so far.
+
+    The moduli live in a list of product trees. Single appends are merged
+    binary-counter style, so there are at most log2(N) of those and each
+    modulus is rebuilt into a larger tree only log2(N) times. A batch
+    appended with extend() stays as its own subtree.
+
+    The trees can be saved to a directory and loaded back, so a nightly
+    run only builds the tree of the new batch and computes the cross terms
+    between it and the stored corpus.
+    """
+
+    def __init__(self):
+        self.trees = []
+        self.names = []
+        self.count = 0
+        self._next_id = 0
+        self._saved = set()
+
+    def __len__(self):
+        return self.count
+
+    def leaves(self):
+        for levels in self.trees:
+            yield from levels[0]
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError("modulus index out of range")
+        for levels in self.trees:
+            if index < len(levels[0]):
+                return levels[0][index]
+            index -= len(levels[0])
+
+    def _proper(self, index, n):
+        """A proper factor of n shared with another modulus, else n"""
+        for j, g in self.shared(n):
+            if j != index and g != n:
+                return g
+        return n
+
+    def _push(self, levels):
+        self.trees.append(levels)
+        self.names.append(f"tree-{self._next_id:06d}")
+        self._next_id += 1
+
+    def shared(self, n):
+        """
+        Every earlier modulus that shares a factor with n.
+
+        One gcd against the product of all tree roots (reduced mod n)
+        rules out the common no-hit case; only on a hit are the trees
+        descended. Returns a list of (index, gcd).
+        """
+        if not self.trees:
+            return []
+        acc = 1
+        for levels in self.trees:
+            acc = acc * (levels[-1][0] % n) % n
+        if gcd(n, acc) == 1:
+            return []
+        hits = []
+        offset = 0
+        for levels in self.trees:
+            hits.extend(descend(levels, n, offset))
+            offset += len(levels[0])
+        return sorted(hits)
+
+    def add(self, n):
+        """Append one modulus and return its index"""
+        self._push([[n]])
+        self.count += 1
+        while len(self.trees) > 1:
+            size = len(self.trees[-1][0])
+            if size != len(self.trees[-2][0]) or size & (size - 1):
+                break
+            right, left = self.trees.pop(), self.trees.pop()
+            del self.names[-2:]
+            merged = [a + b for a, b in zip(left, right)]
+            merged.append([left[-1][0] * right[-1][0]])
+            self._push(merged)
+        return self.count - 1
+
+    def extend(self, moduli):
+        """
+        Append a batch of moduli as one new subtree.
+
+        Only the cross terms are computed: the batch's own remainder tree
+        is run over (batch product * stored product), and the stored trees
+        are descended with the batch product only where it shares a
+        factor. The cost scales with the batch, not with the corpus.
+
+        Returns (new_hits, old_hits). new_hits lists (index, gcd) for new
+        moduli that share a factor with any other modulus, old_hits lists
+        (index, gcd with the batch) for stored moduli.
+        """
+        moduli = list(moduli)
+        if not moduli:
+            return [], []
+        levels = product_tree(moduli)
+        batch = levels[-1][0]
+        square = batch * batch
+        stored = 1
+        for tree in self.trees:
+            stored = stored * (tree[-1][0] % square) % square
+
+        rems = remainder_tree(levels, batch * stored)
+        new_hits = []
+        for i, (r, n) in enumerate(zip(rems, moduli)):
+            g = gcd(r // n, n)
+            if g != 1:
+                new_hits.append((self.count + i, g))
+
+        old_hits = []
+        if self.trees and gcd(batch, stored % batch) != 1:
+            offset = 0
+            for tree in self.trees:
+                old_hits.extend(descend(tree, batch, offset))
+                offset += len(tree[0])
+            old_hits.sort()
+
+        self._push(levels)
+        self.count += len(moduli)
+        # gcd == n is not a factor: look for a proper one pairwise
+        new_hits = [(i, self._proper(i, self[i]) if g == self[i] else g) for i, g in new_hits]
+        old_hits = [(i, self._proper(i, self[i]) if g == self[i] else g) for i, g in old_hits]
+        return new_hits, old_hits
+
+    def save(self, directory):
+        """Write trees not yet on disk, drop merged ones, then the manifest"""
+        os.makedirs(directory, exist_ok=True)
+        for name, levels in zip(self.names, self.trees):
+            if name in self._saved:
+                continue
+            tree_dir = os.path.join(directory, name)
+            os.makedirs(tree_dir, exist_ok=True)
+            for k, level in enumerate(levels):
+                _write_level(os.path.join(tree_dir, f"level-{k:02d}.bin"), level)
+            self._saved.add(name)
+
+        manifest = {"count": self.count, "next_id": self._next_id, "trees": self.names}
+        tmp = os.path.join(directory, "manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, os.path.join(directory, "manifest.json"))
+
+        for name in self._saved - set(self.names):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        self._saved &= set(self.names)
+
+    @classmethod
+    def load(cls, directory):
+        """Load a forest written by save(); an empty forest if there is none"""
+        forest = cls()
+        path = os.path.join(directory, "manifest.json")
+        if not os.path.exists(path):
+            return forest
+        with open(path) as f:
+            manifest = json.load(f)
+        for name in manifest["trees"]:
+            tree_dir = os.path.join(directory, name)
+            levels = []
+            k = 0
+            while os.path.exists(os.path.join(tree_dir, f"level-{k:02d}.bin")):
+                levels.append(_read_level(os.path.join(tree_dir, f"level-{k:02d}.bin")))
+                k += 1
+            forest.trees.append(levels)
+            forest.names.append(name)
+        forest.count = manifest["count"]
+        forest._next_id = manifest["next_id"]
+        forest._saved = set(forest.names)
+        return forest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="kctf factor",
+                                     description="Batch GCD over moduli, optionally against a stored corpus")
+    parser.add_argument("files", nargs="*",
+                        help="files with the new batch of moduli, one per line (default: the challenge bombs)")
+    parser.add_argument("--state", metavar="DIR",
+                        help="directory holding the product trees from earlier runs")
+    args = parser.parse_args(argv)
+
+    batch = []
+    for path in args.files:
+        with open(path) as f:
+            batch.extend(parse_modulus(line) for line in f if line.strip())
+    if not args.files:
+        from .challenge import BOMBS
+        batch = list(BOMBS.values())
+
+    forest = ProductForest.load(args.state) if args.state else ProductForest()
+    print(f"Stored moduli: {len(forest)} in {len(forest.trees)} trees")
+
+    with instrument.stage("dedupe"):
+        batch, clusters = dedupe(batch)
+        known = 0
+        if len(forest):
+            stored = Deduplicator(forest.__getitem__)
+            stored.load(forest.leaves())
+            fresh = [n for n in batch if stored.seen(n) is None]
+            known, batch = len(batch) - len(fresh), fresh
+    if clusters:
+        print(f"Dropped {sum(len(c) - 1 for c in clusters)} duplicate moduli from the batch")
+    if known:
+        print(f"Dropped {known} moduli already in the stored corpus")
+    with instrument.stage("extend"):
+        new_hits, old_hits = forest.extend(batch)
+    if args.state:
+        with instrument.stage("save"):
+            forest.save(args.state)
+
+    print(f"New batch: {len(batch)} moduli")
+    for index, g in new_hits:
+        if g == forest[index]:
+            print(f"  new #{index} is a copy or divisor of a stored modulus")
+        else:
+            print(f"  new #{index} shares a factor: {g}")
+    for index, g in old_hits:
+        if g == forest[index]:
+            print(f"  stored #{index} is a copy or divisor of a new modulus")
+        else:
+            print(f"  stored #{index} shares a factor with the batch: {g}")
+    if not new_hits and not old_hits:
+        print("  no shared factors")
+
+
+if __name__ == "__main__":
+    instrument.enable_from_argv()
+    main()
@@ -0,0 +1,259 @@
+"""
+Riddler: Null Set - Pairwise Relations
+
+solve.py and solve_final.py XOR the bombs pair by pair, solve_modular.py
+takes their differences and solve_rsa.py runs the pairwise gcds and then
+guesses how the primes are laid out. Relations computes each of those
+pairwise "wounds" at most once, keyed by the index pair, and turns the
+gcds into a sharing graph: which factors divide which values.
+
+Nothing is computed for a pair until it is asked for. To build the graph
+a batch GCD first picks out the values that share anything at all, and
+the partners of each of those are found by descending a product tree
+over that subset only, so thousands of values with a handful of related
+keys cost a few tree passes instead of n²/2 gcds.
+
+Factorizations come from propagating the edge gcds through each
+connected component: the gcds and the values are refined into a coprime
+base, so a prime found between hospital and subway splits hospital,
+whose cofactor in turn splits financial. For the bombs this recovers
+hospital = p·q, subway = p·s and financial = q·s with no guessing.
+"""
+
+import argparse
+import math
+
+from . import instrument
+from .primitives import gcd, parse_modulus
+
+
+def _pair(i, j):
+    return (i, j) if i < j else (j, i)
+
+
+def coprime_base(values):
+    """
+    Pairwise coprime numbers that every value > 1 factors over.
+
+    Two entries with a common factor g are replaced by g and their
+    cofactors until no two entries share anything. Returned sorted.
+    Calls math.gcd directly: the loop is timed as a whole by the
+    relations-propagate stage.
+    """
+    base = []
+    work = [v for v in values if v > 1]
+    while work:
+        x = work.pop()
+        for i, b in enumerate(base):
+            g = math.gcd(x, b)
+            if g == 1:
+                continue
+            del base[i]
+            work.extend(y for y in (g, b // g, x // g) if y > 1)
+            break
+        else:
+            base.append(x)
+    return sorted(base)
+
+
+def factor_over(n, base):
+    """{factor: exponent} of n over a coprime base that covers it"""
+    factors = {}
+    for f in base:
+        while n % f == 0:
+            n //= f
+            factors[f] = factors.get(f, 0) + 1
+        if n == 1:
+            break
+    return factors
+
+
+def components(edges):
+    """Connected components of an edge set, as sorted lists of nodes"""
+    parent = {}
+
+    def find(i):
+        parent.setdefault(i, i)
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in edges:
+        parent[find(i)] = find(j)
+    groups = {}
+    for i in parent:
+        groups.setdefault(find(i), []).append(i)
+    return sorted(sorted(group) for group in groups.values())
+
+
+class Relations:
+    """
+    Memoized pairwise gcd, xor and difference over a fixed list of values.
+
+    Every relation is cached under the unordered index pair the first
+    time it is asked for; diff(i, j) and diff(j, i) share one entry.
+    """
+
+    def __init__(self, values, names=None):
+        self.values = list(values)
+        self.names = list(names) if names is not None else [f"#{i}" for i in range(len(self.values))]
+        self._gcd = {}
+        self._xor = {}
+        self._diff = {}
+        self._edges = None
+        self._factors = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def gcd(self, i, j):
+        key = _pair(i, j)
+        g = self._gcd.get(key)
+        if g is None:
+            g = self._gcd[key] = gcd(self.values[key[0]], self.values[key[1]])
+        return g
+
+    def xor(self, i, j):
+        key = _pair(i, j)
+        x = self._xor.get(key)
+        if x is None:
+            x = self._xor[key] = self.values[key[0]] ^ self.values[key[1]]
+        return x
+
+    def diff(self, i, j):
+        """values[i] - values[j]"""
+        key = _pair(i, j)
+        d = self._diff.get(key)
+        if d is None:
+            d = self._diff[key] = self.values[key[0]] - self.values[key[1]]
+        return d if key == (i, j) else -d
+
+    def cached(self):
+        """Number of pairs computed so far for each relation"""
+        return {"gcd": len(self._gcd), "xor": len(self._xor), "diff": len(self._diff)}
+
+    def edges(self):
+        """
+        {(i, j): gcd} for every pair of values with a common factor.
+
+        Only values that batch_gcd() reports as sharing something are put
+        in the product tree that is searched, and every gcd found on the
+        way lands in the pair cache.
+        """
+        if self._edges is None:
+            from .product_tree import batch_gcd, descend, product_tree
+
+            with instrument.stage("relations-batch-gcd"):
+                shared = [i for i, g in enumerate(batch_gcd(self.values)) if g != 1]
+            edges = {}
+            if shared:
+                levels = product_tree([self.values[i] for i in shared])
+                with instrument.stage("relations-descend"):
+                    for position, i in enumerate(shared):
+                        for leaf, g in descend(levels, self.values[i]):
+                            if leaf > position:
+                                key = _pair(i, shared[leaf])
+                                edges[key] = self._gcd.setdefault(key, g)
+            self._edges = edges
+        return self._edges
+
+    def factorizations(self):
+        """
+        {index: {factor: exponent}} for every value with a common factor.
+
+        Each connected component of the graph gets its own coprime base,
+        so the cost grows with the size of the components rather than of
+        the whole set. Factors are pairwise coprime but stay composite
+        when nothing in the set separates them.
+        """
+        if self._factors is None:
+            edges = self.edges()
+            factors = {}
+            with instrument.stage("relations-propagate"):
+                groups = components(edges)
+                where = {i: k for k, nodes in enumerate(groups) for i in nodes}
+                links = [[] for _ in groups]
+                for (i, _), g in edges.items():
+                    links[where[i]].append(g)
+                for nodes, gcds in zip(groups, links):
+                    base = coprime_base(gcds + [self.values[i] for i in nodes])
+                    for i in nodes:
+                        factors[i] = factor_over(self.values[i], base)
+            self._factors = factors
+        return self._factors
+
+    def sharing(self):
+        """{factor: [indices]} for every factor that divides two or more values"""
+        graph = {}
+        for i, factors in self.factorizations().items():
+            for f in factors:
+                graph.setdefault(f, []).append(i)
+        return {f: nodes for f, nodes in graph.items() if len(nodes) > 1}
+
+
+def challenge_relations():
+    """Relations over the challenge bombs, named and ordered as in BOMBS"""
+    from .challenge import BOMBS
+
+    return Relations(BOMBS.values(), BOMBS)
+
+
+def _factor_label(f, labels):
+    if f not in labels:
+        labels[f] = f"f{len(labels)}"
+    return labels[f]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="kctf relations",
+                                     description="Pairwise gcd/xor/difference relations and the factor sharing graph")
+    parser.add_argument("files", nargs="*",
+                        help="files with values, one per line (default: the challenge bombs)")
+    parser.add_argument("--pairs", action="store_true",
+                        help="also print the xor and difference of every related pair")
+    args = parser.parse_args(argv)
+
+    values, names = [], []
+    for path in args.files:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    values.append(parse_modulus(line))
+                    names.append(f"{path}:{len(names)}")
+    relations = Relations(values, names) if args.files else challenge_relations()
+    names = relations.names
+    edges = relations.edges()
+    factors = relations.factorizations()
+    sharing = relations.sharing()
+    print(f"Values: {len(relations)}, related: {len(factors)}, edges: {len(edges)}")
+
+    labels = {}
+    print("\nShared factors:")
+    for f, nodes in sorted(sharing.items(), key=lambda item: (-len(item[1]), item[0])):
+        print(f"  {_factor_label(f, labels)} ({f.bit_length()} bits) divides {', '.join(names[i] for i in nodes)}")
+    if not sharing:
+        print("  none")
+
+    print("\nFactorizations:")
+    for i, fs in sorted(factors.items()):
+        terms = " · ".join(_factor_label(f, labels) + (f"^{k}" if k > 1 else "") for f, k in fs.items())
+        print(f"  {names[i]} = {terms}")
+    for f, label in labels.items():
+        print(f"  {label} = {f}")
+
+    if args.pairs:
+        print("\nRelated pairs:")
+        for i, j in sorted(edges):
+            x = relations.xor(i, j)
+            d = relations.diff(i, j)
+            print(f"  {names[i]} ⊕ {names[j]}: {x.bit_length()} bits, weight {bin(x).count('1')}; "
+                  f"difference {d.bit_length()} bits")
+
+    cached = relations.cached()
+    print(f"\nPairs computed: {cached['gcd']} gcd, {cached['xor']} xor, {cached['diff']} diff")
+
+
+if __name__ == "__main__":
+    instrument.enable_from_argv()
+    main()
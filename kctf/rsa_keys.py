@@ -0,0 +1,232 @@
+"""
+Riddler: Null Set - Factored RSA Keys
+
+solve_rsa.py builds φ by hand for each guess (two primes, then p·q·s)
+and does one full-width pow() per attempt. A FactoredKey takes any
+number of primes with multiplicity, knows both φ(n) and Carmichael's
+λ(n), and decrypts with one exponentiation per prime power followed by a
+CRT recombination.
+
+The per-prime-power exponents are cached on (p, k, e), so the hospital,
+subway and financial keys (and any product of them) share the work for
+the primes they have in common, and key() hands out one cached object
+per (factorization, e).
+"""
+
+import argparse
+from collections import Counter
+from functools import cached_property, lru_cache
+from math import lcm
+
+from . import instrument
+from .primitives import gcd, powmod
+from .relations import components
+
+COMMON_EXPONENTS = (3, 5, 17, 257, 65537)
+
+
+def carmichael_prime_power(p, k):
+    """λ(p^k)"""
+    if p == 2 and k >= 3:
+        return 2 ** (k - 2)
+    return p ** (k - 1) * (p - 1)
+
+
+@lru_cache(maxsize=4096)
+def prime_power_exponent(p, k, e):
+    """(p^k, e^-1 mod λ(p^k)) shared by every key that contains p^k"""
+    lam = carmichael_prime_power(p, k)
+    if gcd(e, lam) != 1:
+        raise ValueError(f"e={e} is not invertible modulo λ({p}^{k})")
+    return p ** k, pow(e, -1, lam)
+
+
+class FactoredKey:
+    """
+    RSA key with a known factorization n = Π p_i^k_i.
+
+    Decryption recovers m mod p_i^k_i for every prime power and combines
+    them with the CRT. For k > 1 this assumes gcd(m, p) = 1, as textbook
+    RSA does.
+    """
+
+    def __init__(self, factors, e=65537):
+        if not isinstance(factors, dict):
+            factors = Counter(factors)
+        self.factors = dict(sorted(factors.items()))
+        self.e = e
+        # Fail early when e does not invert modulo some prime power
+        self.parts = [prime_power_exponent(p, k, e) for p, k in self.factors.items()]
+
+    def __repr__(self):
+        primes = " * ".join(f"p{i}^{k}" if k > 1 else f"p{i}" for i, k in enumerate(self.factors.values()))
+        return f"FactoredKey({primes}, e={self.e}, {self.n.bit_length()} bits)"
+
+    @cached_property
+    def n(self):
+        n = 1
+        for modulus, _ in self.parts:
+            n *= modulus
+        return n
+
+    @cached_property
+    def phi(self):
+        """Euler's φ(n)"""
+        phi = 1
+        for p, k in self.factors.items():
+            phi *= p ** (k - 1) * (p - 1)
+        return phi
+
+    @cached_property
+    def lam(self):
+        """Carmichael's λ(n)"""
+        return lcm(*(carmichael_prime_power(p, k) for p, k in self.factors.items()))
+
+    @cached_property
+    def d(self):
+        """The smallest private exponent, e^-1 mod λ(n)"""
+        return pow(self.e, -1, self.lam)
+
+    @cached_property
+    def d_phi(self):
+        """The textbook private exponent, e^-1 mod φ(n)"""
+        return pow(self.e, -1, self.phi)
+
+    @cached_property
+    def _crt(self):
+        """Garner coefficients: inverse of the product of earlier moduli mod each modulus"""
+        coefficients = []
+        prefix = 1
+        for modulus, _ in self.parts:
+            coefficients.append(pow(prefix, -1, modulus) if prefix > 1 else 1)
+            prefix *= modulus
+        return coefficients
+
+    def decrypt(self, c):
+        """m = c^d mod n, one exponentiation per prime power"""
+        with instrument.stage("rsa.decrypt"):
+            m = 0
+            prefix = 1
+            for (modulus, d), coefficient in zip(self.parts, self._crt):
+                r = powmod(c % modulus, d, modulus)
+                m += prefix * ((r - m) * coefficient % modulus)
+                prefix *= modulus
+            return m
+
+    def encrypt(self, m):
+        return powmod(m, self.e, self.n)
+
+
+@lru_cache(maxsize=1024)
+def _key(factors, e):
+    return FactoredKey(dict(factors), e)
+
+
+def key(factors, e=65537):
+    """
+    Cached FactoredKey for a factorization, given as a {prime: exponent}
+    dict or an iterable of primes with repeats.
+    """
+    if not isinstance(factors, dict):
+        factors = Counter(factors)
+    return _key(tuple(sorted(factors.items())), e)
+
+
+def probable_prime(n, bases=(2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)):
+    """Miller-Rabin with fixed bases; FactoredKey needs prime factors"""
+    if n < 2:
+        return False
+    for p in bases:
+        if n % p == 0:
+            return n == p
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+    for a in bases:
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def candidate_factorizations(relations):
+    """
+    {name: Counter of primes} for every key worth trying, read off the
+    sharing graph instead of guessed: each related value, the product of
+    each related pair, and per connected component the product of its
+    distinct factors and of all its values.
+    """
+    factors = relations.factorizations()
+    names = relations.names
+    edges = relations.edges()
+    candidates = {}
+    for i, fs in sorted(factors.items()):
+        candidates[names[i]] = Counter(fs)
+    for i, j in sorted(edges):
+        candidates[f"{names[i]}·{names[j]}"] = Counter(factors[i]) + Counter(factors[j])
+    for nodes in components(edges):
+        label = "·".join(names[i] for i in nodes)
+        candidates[f"distinct factors of {label}"] = Counter({f: 1 for i in nodes for f in factors[i]})
+        candidates[f"all of {label}"] = sum((Counter(factors[i]) for i in nodes), Counter())
+    unique = {}
+    for name, primes in candidates.items():
+        if primes not in unique.values():
+            unique[name] = primes
+    return unique
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="kctf decrypt",
+                                     description="Multi-prime RSA decryption of the flag with the shared factors")
+    parser.add_argument("-e", type=int, action="append", dest="exponents",
+                        help="public exponent to try (repeatable, default: common exponents)")
+    args = parser.parse_args(argv)
+    exponents = args.exponents or COMMON_EXPONENTS
+
+    from .challenge import FLAG_ENCRYPTED, FLAG_FORMAT
+    from .decoding import decode_batch
+    from .relations import challenge_relations
+
+    print("=== Riddler: Null Set - Multi-prime RSA ===\n")
+    relations = challenge_relations()
+    labels = {}
+    for f, nodes in relations.sharing().items():
+        labels[f] = f"p{len(labels)}"
+        print(f"{labels[f]} ({f.bit_length()} bits) divides {', '.join(relations.names[i] for i in nodes)}")
+    print()
+
+    candidates = []
+    for name, primes in candidate_factorizations(relations).items():
+        if not all(probable_prime(f) for f in primes):
+            print(f"Skipping {name}: a factor is still composite")
+            continue
+        terms = (labels.get(f, f"{f.bit_length()}-bit") + (f"^{k}" if k > 1 else "") for f, k in primes.items())
+        name = f"{name} ({' · '.join(terms)})"
+        for e in exponents:
+            try:
+                k = key(primes, e)
+            except ValueError:
+                continue
+            if FLAG_ENCRYPTED >= k.n:
+                continue
+            candidates.append((name, e, k.decrypt(FLAG_ENCRYPTED), (k.n.bit_length() + 7) // 8))
+    print(f"Decrypted {len(candidates)} (modulus, e) combinations")
+
+    for name, e, m, size in candidates:
+        for _, chain, text in decode_batch([m], size):
+            print(f"✓ SUCCESS with {name}, e={e} (decoded as {chain})")
+            print(f"Flag: {FLAG_FORMAT.format(text)}")
+            return
+    print("No combination produced a readable plaintext.")
+
+
+if __name__ == "__main__":
+    instrument.enable_from_argv()
+    main()
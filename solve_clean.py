@@ -6,7 +6,8 @@ This script demonstrates the RSA common factor attack by factoring
 the three "bomb" numbers using GCD operations.
 """
 
-from math import gcd
+from kctf import instrument
+from kctf.primitives import gcd
 
 def main():
     # The three "bombs" from chall.md
@@ -24,9 +25,10 @@ def main():
     print("-" * 70)
     
     # Find the common factors using GCD
-    p = gcd(hospital, subway)
-    q = gcd(hospital, financial)
-    s = gcd(subway, financial)
+    with instrument.stage("factor"):
+        p = gcd(hospital, subway)
+        q = gcd(hospital, financial)
+        s = gcd(subway, financial)
     
     print(f"p = gcd(Hospital, Subway)")
     print(f"  = {p}")
@@ -44,9 +46,10 @@ def main():
     print("-" * 70)
     
     # Verify the factorization
-    hospital_check = (p * q == hospital)
-    subway_check = (p * s == subway)
-    financial_check = (q * s == financial)
+    with instrument.stage("verify"):
+        hospital_check = (p * q == hospital)
+        subway_check = (p * s == subway)
+        financial_check = (q * s == financial)
     
     print(f"Hospital = p × q ? {hospital_check} ✓" if hospital_check else f"Hospital = p × q ? {hospital_check} ✗")
     print(f"Subway = p × s ? {subway_check} ✓" if subway_check else f"Subway = p × s ? {subway_check} ✗")
@@ -88,4 +91,5 @@ def main():
         print("✗ Factorization verification failed!")
 
 if __name__ == "__main__":
+    instrument.enable_from_argv()
     main()
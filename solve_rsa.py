@@ -6,7 +6,10 @@ The three "bombs" share common factors, which means we can factor them
 and potentially decrypt the flag using RSA mathematics.
 """
 
-from math import gcd
+from kctf import instrument
+from kctf.primitives import gcd, powmod, is_printable
+
+instrument.enable_from_argv()
 
 # The three "bombs" (likely RSA moduli that share factors)
 hospital = 17228885174970084276161970522097412605266394159971647740752267300221714788550197385293497867284890619874129427467673441688167088281496263523126626874873040420690149997429144654882986643604004320995801451651978549126665724326037323443693785147308295273804941176324595270160848031743691643352199091770561183390101638892864365971529361775777473322338259828117124021731569968581096105773133290818616623517239075045010723533051858606599891085860123293236498867687161911760308272069433482552999066140765265852927860548903142423166019118304640362315363826033542802010314992302177183041218307694787831493560402247717975058777
@@ -119,7 +122,7 @@ for e in [3, 5, 17, 65537]:
         d = mod_inverse(e, phi_h)
         if d:
             print(f"Trying Hospital with e={e}...")
-            plaintext = pow(flag_encrypted, d, hospital)
+            plaintext = powmod(flag_encrypted, d, hospital)
             
             # Convert to hex and try to decode
             pt_hex = hex(plaintext)[2:]
@@ -129,7 +132,7 @@ for e in [3, 5, 17, 65537]:
             try:
                 pt_bytes = bytes.fromhex(pt_hex)
                 pt_str = pt_bytes.decode('ascii')
-                if all(32 <= ord(c) < 127 for c in pt_str):
+                if is_printable(pt_str):
                     print(f"SUCCESS!")
                     print(f"Plaintext: {pt_str}")
                     print(f"Flag: ctf{{{pt_str}}}kernel")
@@ -151,7 +154,7 @@ for e in [3, 5, 17, 65537]:
         d = mod_inverse(e, phi_s)
         if d:
             print(f"Trying Subway with e={e}...")
-            plaintext = pow(flag_encrypted, d, subway)
+            plaintext = powmod(flag_encrypted, d, subway)
             
             # Convert to hex and try to decode
             pt_hex = hex(plaintext)[2:]
@@ -161,7 +164,7 @@ for e in [3, 5, 17, 65537]:
             try:
                 pt_bytes = bytes.fromhex(pt_hex)
                 pt_str = pt_bytes.decode('ascii')
-                if all(32 <= ord(c) < 127 for c in pt_str):
+                if is_printable(pt_str):
                     print(f"SUCCESS!")
                     print(f"Plaintext: {pt_str}")
                     print(f"Flag: ctf{{{pt_str}}}kernel")
@@ -183,7 +186,7 @@ for e in [3, 5, 17, 65537]:
         d = mod_inverse(e, phi_f)
         if d:
             print(f"Trying Financial with e={e}...")
-            plaintext = pow(flag_encrypted, d, financial)
+            plaintext = powmod(flag_encrypted, d, financial)
             
             # Convert to hex and try to decode
             pt_hex = hex(plaintext)[2:]
@@ -193,7 +196,7 @@ for e in [3, 5, 17, 65537]:
             try:
                 pt_bytes = bytes.fromhex(pt_hex)
                 pt_str = pt_bytes.decode('ascii')
-                if all(32 <= ord(c) < 127 for c in pt_str):
+                if is_printable(pt_str):
                     print(f"SUCCESS!")
                     print(f"Plaintext: {pt_str}")
                     print(f"Flag: ctf{{{pt_str}}}kernel")
@@ -219,7 +222,7 @@ for e in [3, 5, 17, 65537]:
         d = mod_inverse(e, phi_pqs)
         if d:
             print(f"Trying e={e}...")
-            plaintext = pow(flag_encrypted, d, n_pqs)
+            plaintext = powmod(flag_encrypted, d, n_pqs)
             
             # Convert to hex and try to decode
             pt_hex = hex(plaintext)[2:]
@@ -229,7 +232,7 @@ for e in [3, 5, 17, 65537]:
             try:
                 pt_bytes = bytes.fromhex(pt_hex)
                 pt_str = pt_bytes.decode('ascii')
-                if all(32 <= ord(c) < 127 for c in pt_str):
+                if is_printable(pt_str):
                     print(f"SUCCESS!")
                     print(f"Plaintext: {pt_str}")
                     print(f"Flag: ctf{{{pt_str}}}kernel")
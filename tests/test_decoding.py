@@ -0,0 +1,66 @@
+import base64
+import hashlib
+import random
+import zlib
+
+import pytest
+
+from kctf.challenge import HOSPITAL
+from kctf.decoding import _mgf1, decode_batch, decode_plaintext, prefilter
+from kctf.primitives import int_to_bytes
+
+SIZE = (HOSPITAL.bit_length() + 7) // 8
+
+
+def oaep_block(message, size, hash_func=hashlib.sha1, seed=b"\x5a" * 64):
+    """RSAES-OAEP encoding of message with an empty label"""
+    h_len = hash_func().digest_size
+    db = hash_func(b"").digest() + b"\x00" * (size - len(message) - 2 * h_len - 2) + b"\x01" + message
+    seed = seed[:h_len]
+    masked_db = bytes(a ^ b for a, b in zip(db, _mgf1(seed, size - h_len - 1, hash_func)))
+    masked_seed = bytes(a ^ b for a, b in zip(seed, _mgf1(masked_db, h_len, hash_func)))
+    return int.from_bytes(b"\x00" + masked_seed + masked_db, "big")
+
+
+def test_little_endian_text_ranks_first():
+    hits = decode_batch([int.from_bytes(b"flag{little_endian}", "little")])
+    assert hits[0] == (0, "reversed", "flag{little_endian}")
+    assert decode_plaintext(int.from_bytes(b"the quick brown fox", "little")) == ("reversed", "the quick brown fox")
+
+
+def test_big_endian_text_ranks_first():
+    hits = decode_batch([b"flag{big_endian}"])
+    assert hits[0] == (0, "plain", "flag{big_endian}")
+
+
+def test_identical_byte_orders_are_reported_once():
+    assert decode_batch([b"A" * 300]) == [(0, "plain", "A" * 300)]
+
+
+def test_reversed_with_trailing_nuls_and_magic():
+    assert decode_batch([b"galf\x00\x00\x00"]) == [(0, "reversed", "flag")]
+    assert decode_batch([zlib.compress(b"hello flag")[::-1]]) == [(0, "reversed+zlib", "hello flag")]
+
+
+def test_wrapped_base64():
+    text = "flag{" + "wrapped base64 long enough to span several lines " * 3 + "}"
+    assert decode_batch([base64.encodebytes(text.encode())]) == [(0, "base64", text)]
+
+
+def test_padded_and_encoded_chain():
+    inner = base64.b64encode(zlib.compress(b"flag{chain}"))
+    block = b"\x02" + bytes(range(1, 30)) + b"\x00" + inner
+    assert (0, "pkcs1+base64+zlib", "flag{chain}") in decode_batch([block])
+
+
+@pytest.mark.parametrize("hash_func", [hashlib.sha1, hashlib.sha256])
+def test_oaep_block_decodes(hash_func):
+    assert decode_batch([oaep_block(b"flag{oaep}", SIZE, hash_func)], SIZE) == [(0, "oaep", "flag{oaep}")]
+
+
+def test_oaep_prefilter_rejects_most_random_blocks():
+    rng = random.Random(1)
+    batch = [int_to_bytes(rng.randrange(HOSPITAL)) for _ in range(1000)]
+    flagged = sum("oaep" in detectors for _, detectors in prefilter(batch, SIZE))
+    # Only blocks whose top byte happens to be zero are one byte short
+    assert flagged < 30
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from kctf.jobs import JobQueue, run
+
+
+@pytest.fixture
+def queues(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    first = JobQueue(path, owner="first", lease=60)
+    second = JobQueue(path, owner="second", lease=60)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def expire(queue, job_id):
+    """Age a job's heartbeat past every lease"""
+    queue.db.execute("UPDATE jobs SET heartbeat = 0 WHERE id = ?", (job_id,))
+
+
+def test_claim_by_priority_then_age(queues):
+    queue, _ = queues
+    low = queue.submit("fermat", {"n": 15})
+    high = queue.submit("fermat", {"n": 21}, priority=5)
+    later = queue.submit("fermat", {"n": 35}, priority=5)
+    assert [queue.claim()["id"] for _ in range(3)] == [high, later, low]
+    assert queue.claim() is None
+
+
+def test_running_job_is_claimable_only_after_its_lease_expires(queues):
+    first, second = queues
+    job_id = first.submit("fermat", {"n": 15})
+    assert first.claim()["id"] == job_id
+    assert second.claim() is None
+
+    # A heartbeat within the lease keeps the job
+    assert first.checkpoint(job_id)
+    assert second.claim() is None
+
+    expire(first, job_id)
+    assert second.claim()["id"] == job_id
+    row, = second.jobs()
+    assert (row["state"], row["owner"]) == ("running", "second")
+
+
+def test_updates_are_guarded_by_owner(queues):
+    first, second = queues
+    job_id = first.submit("fermat", {"n": 15})
+    first.claim()
+    expire(first, job_id)
+    second.claim()
+
+    assert not first.checkpoint(job_id, {"a": 4, "step": 0})
+    assert not first.finish(job_id, {"p": 3, "q": 5})
+    assert not first.fail(job_id, "stale")
+    assert not first.requeue(job_id)
+    row, = second.jobs()
+    assert (row["state"], row["checkpoint"], row["result"]) == ("running", None, None)
+
+    assert second.checkpoint(job_id, {"a": 4, "step": 0})
+    assert second.finish(job_id, {"p": 3, "q": 5})
+    row, = second.jobs()
+    assert row["state"] == "done"
+    assert json.loads(row["checkpoint"]) == {"a": 4, "step": 0}
+    assert json.loads(row["result"]) == {"p": 3, "q": 5}
+
+
+def test_requeue_releases_the_job(queues):
+    first, second = queues
+    job_id = first.submit("fermat", {"n": 15})
+    first.claim()
+    assert first.requeue(job_id)
+    assert second.claim()["id"] == job_id
+
+
+def test_pre_lease_database_is_migrated(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    db = sqlite3.connect(path)
+    db.execute("""
+        CREATE TABLE jobs (
+            id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL,
+            params TEXT NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            state TEXT NOT NULL DEFAULT 'queued',
+            checkpoint TEXT,
+            result TEXT,
+            error TEXT,
+            created REAL NOT NULL,
+            updated REAL NOT NULL
+        )""")
+    db.execute("INSERT INTO jobs (kind, params, state, checkpoint, created, updated) "
+               "VALUES ('fermat', '{\"n\": 15}', 'running', '{\"a\": 4, \"step\": 0}', 0, 0)")
+    db.execute("INSERT INTO jobs (kind, params, state, result, created, updated) "
+               "VALUES ('fermat', '{\"n\": 21}', 'done', '{}', 0, 0)")
+    db.commit()
+    db.close()
+
+    queue = JobQueue(path, owner="new")
+    # The job the old version left running has no owner to wait for
+    job = queue.claim()
+    assert job["id"] == 1 and json.loads(job["checkpoint"]) == {"a": 4, "step": 0}
+    assert queue.claim() is None
+    assert queue.finish(1, {"p": 3, "q": 5})
+    queue.close()
+
+    # Opening a migrated database again leaves it alone
+    queue = JobQueue(path, owner="again")
+    assert [row["state"] for row in queue.jobs()] == ["done", "done"]
+    queue.close()
+
+
+def test_worker_runs_jobs_and_fails_unknown_kinds(queues):
+    queue, _ = queues
+    job_id = queue.submit("fermat", {"n": 1009 * 1013, "chunk": 1})
+    queue.db.execute("INSERT INTO jobs (kind, params, created, updated) VALUES ('gone', '{}', 0, 0)")
+    queue.db.execute("INSERT INTO jobs (kind, params, created, updated) VALUES ('trial', 'not json', 0, 0)")
+
+    asyncio.run(run(queue, concurrency=1, interval=0.05))
+    done, gone, broken = queue.jobs()
+    assert done["id"] == job_id and done["state"] == "done"
+    assert {json.loads(done["result"])["p"], json.loads(done["result"])["q"]} == {1009, 1013}
+    assert (gone["state"], broken["state"]) == ("failed", "failed")
+    assert "unknown attack" in gone["error"]
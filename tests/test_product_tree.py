@@ -0,0 +1,142 @@
+import math
+import random
+
+import pytest
+
+from kctf.audit import AuditService
+from kctf.modstore import small_primes
+from kctf.product_tree import ProductForest, batch_gcd, main, resolve_full
+
+# Few, small primes so that random semiprimes share factors and repeat often
+PRIMES = small_primes(2000)[100:140]
+
+
+def semiprimes(rng, count):
+    return [rng.choice(PRIMES) * rng.choice(PRIMES) for _ in range(count)]
+
+
+def others_gcd(moduli, i):
+    """gcd of moduli[i] with the product of every other modulus"""
+    rest = math.prod(m for j, m in enumerate(moduli) if j != i)
+    return math.gcd(moduli[i], rest)
+
+
+def allowed(moduli, i, g):
+    """The results a gcd == n may be resolved to by _proper()"""
+    n = moduli[i]
+    if g != n:
+        return {g}
+    proper = {math.gcd(n, m) for j, m in enumerate(moduli) if j != i} - {1, n}
+    return proper or {n}
+
+
+def check_extend(moduli, start, new_hits, old_hits):
+    batch = math.prod(moduli[start:])
+    expected_new = [i for i in range(start, len(moduli)) if others_gcd(moduli, i) != 1]
+    assert [i for i, _ in new_hits] == expected_new
+    for i, g in new_hits:
+        assert g in allowed(moduli, i, others_gcd(moduli, i))
+    expected_old = [i for i in range(start) if math.gcd(moduli[i], batch) != 1]
+    assert [i for i, _ in old_hits] == expected_old
+    for i, g in old_hits:
+        assert g in allowed(moduli, i, math.gcd(moduli[i], batch))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_mixed_add_and_extend_match_pairwise_gcd(seed):
+    rng = random.Random(seed)
+    forest = ProductForest()
+    moduli = []
+    for _ in range(30):
+        if rng.random() < 0.7:
+            n = semiprimes(rng, 1)[0]
+            expected = [(j, math.gcd(n, m)) for j, m in enumerate(moduli) if math.gcd(n, m) != 1]
+            assert forest.shared(n) == expected
+            assert forest.add(n) == len(moduli)
+            moduli.append(n)
+        else:
+            batch = semiprimes(rng, rng.randint(1, 9))
+            start = len(moduli)
+            moduli.extend(batch)
+            check_extend(moduli, start, *forest.extend(batch))
+        assert list(forest.leaves()) == moduli
+        assert [forest[i] for i in range(len(forest))] == moduli
+        for levels in forest.trees:
+            assert levels[-1] == [math.prod(levels[0])]
+
+
+def test_single_adds_merge_like_a_binary_counter():
+    forest = ProductForest()
+    for count in range(1, 70):
+        forest.add(PRIMES[count % len(PRIMES)] * 3)
+        sizes = [len(levels[0]) for levels in forest.trees]
+        assert sizes == [1 << k for k in reversed(range(count.bit_length())) if count >> k & 1]
+
+
+def test_batch_gcd_and_resolve_full_match_pairwise_gcd():
+    rng = random.Random(7)
+    moduli = semiprimes(rng, 40)
+    results = resolve_full(moduli, batch_gcd(moduli))
+    for i, g in enumerate(results):
+        assert g in allowed(moduli, i, others_gcd(moduli, i))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    rng = random.Random(11)
+    forest = ProductForest()
+    forest.extend(semiprimes(rng, 12))
+    for n in semiprimes(rng, 5):
+        forest.add(n)
+    forest.save(tmp_path)
+    # A second save only writes new trees and must not disturb the old ones
+    forest.extend(semiprimes(rng, 4))
+    forest.save(tmp_path)
+
+    loaded = ProductForest.load(tmp_path)
+    assert len(loaded) == len(forest)
+    assert list(loaded.leaves()) == list(forest.leaves())
+    assert loaded.names == forest.names
+    assert loaded.trees == forest.trees
+
+    batch = semiprimes(rng, 6)
+    assert loaded.extend(batch) == forest.extend(batch)
+    n = semiprimes(rng, 1)[0]
+    assert loaded.add(n) == forest.add(n)
+    assert loaded.trees == forest.trees
+
+
+def test_audit_indexes_stored_duplicates_by_position():
+    a, b, c, d = 101 * 103, 107 * 109, 113 * 127, 131 * 137
+    forest = ProductForest()
+    forest.extend([a, b, a, c])
+    service = AuditService([], forest)
+
+    hit, = service.submit(c)
+    assert (hit["kind"], hit["partner"]) == ("duplicate", 3)
+    assert service.submit(d) == []
+    hit, = service.submit(d)
+    assert (hit["kind"], hit["partner"]) == ("duplicate", 4)
+    assert len(forest) == 5
+
+
+def test_factor_state_skips_moduli_already_stored(tmp_path, capsys):
+    state = tmp_path / "corpus"
+    first = tmp_path / "first.txt"
+    second = tmp_path / "second.txt"
+    first.write_text("10403\n11663\n")
+    second.write_text("10403\n14351\n10403\n")
+
+    main(["--state", str(state), str(first)])
+    main(["--state", str(state), str(second)])
+    assert "Dropped 1 moduli already in the stored corpus" in capsys.readouterr().out
+    assert list(ProductForest.load(state).leaves()) == [10403, 11663, 14351]
+
+
+def test_audit_rejects_moduli_below_two():
+    service = AuditService([])
+    for n in (0, 1, -15):
+        with pytest.raises(ValueError):
+            service.submit(n)
+    with pytest.raises(ValueError):
+        service.submit_lines(["15", "0"])
+    assert len(service.forest) == 0